@@ -2,49 +2,109 @@
 Chat handler — the main orchestration pipeline.
 
 For each user message:
-  1. Run semantic + hybrid search against pgvector (in thread-pool to avoid blocking).
+  1. Run semantic + hybrid search against pgvector concurrently (asyncpg pool).
   2. Deduplicate and rank results.
   3. Build the full Llama message list via prompt_builder.
-  4. Stream tokens from the HuggingFace API (sync generator bridged to async via threading).
+  4. Stream tokens from the HuggingFace API (native async client, no thread bridge).
   5. Optionally append fallback CTAs.
   6. Persist the exchange in the conversation store.
   7. Yield a final "done" event carrying source metadata.
 
 Yields dicts:
-    {"type": "token",  "content": str}   — one per streamed token
+    {"type": "token",  "content": str}   — streamed text, coalesced per flush window
     {"type": "done",   "sources": list}  — one final event
 """
 
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import itertools
 import logging
 import os
-import sys
+import re
 import threading
-from typing import AsyncGenerator
+import time
+from collections import OrderedDict
+from typing import AsyncGenerator, Optional
+
+from search import ahybrid_search, asemantic_search
+from models import SearchResult
+
+from chatbot.conversation import conversation_store
+from chatbot.fallback import detect_fallback
+from chatbot.llm import _FALLBACK_MSG, generate_response_async
+from chatbot.prompt_builder import build_messages
+
+logger = logging.getLogger(__name__)
+
+MAX_CONTEXT_CHUNKS: int = int(os.environ.get("MAX_CONTEXT_CHUNKS", "5"))
+
+# Semantic hits at or above this score count as "strong" when deciding
+# whether the hybrid search is worth running.
+STRONG_MATCH_THRESHOLD: float = 0.6
+
+# Streamed tokens are coalesced into one event per window so the server
+# serialises and flushes far fewer SSE / WebSocket frames.
+TOKEN_FLUSH_INTERVAL: float = float(os.environ.get("TOKEN_FLUSH_MS", "30")) / 1000
+TOKEN_FLUSH_CHARS: int = int(os.environ.get("TOKEN_FLUSH_CHARS", "64"))
+
+# Scripted reply for messages that are empty once sanitised.
+_EMPTY_INPUT_MSG = "Sorry, I didn't catch that. Could you rephrase your question?"
+
+# Per-session retrieval cache: repeated questions within a session skip the
+# embedding + pgvector round-trips entirely.
+RETRIEVAL_CACHE_TTL: int = 5 * 60  # seconds
+RETRIEVAL_CACHE_SIZE: int = 256
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+
 
 # ---------------------------------------------------------------------------
-# Ensure the repo root is importable so we can reach the flat RAG modules
-# (config.py, search.py, models.py, embedding.py).
-# When uvicorn is run from the repo root this is already on sys.path, but
-# this guard makes the import work regardless of launch directory.
+# Retrieval cache
 # ---------------------------------------------------------------------------
-_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-if _REPO_ROOT not in sys.path:
-    sys.path.insert(0, _REPO_ROOT)
 
-from search import hybrid_search, semantic_search  # noqa: E402
-from models import SearchResult  # noqa: E402
 
-from chatbot.conversation import conversation_store  # noqa: E402
-from chatbot.fallback import detect_fallback  # noqa: E402
-from chatbot.llm import _FALLBACK_MSG, generate_response  # noqa: E402
-from chatbot.prompt_builder import build_messages  # noqa: E402
+class _RetrievalCache:
+    """Thread-safe TTL + LRU cache of (session_id, normalised query) → merged results."""
 
-logger = logging.getLogger(__name__)
+    def __init__(self, ttl: int = RETRIEVAL_CACHE_TTL, maxsize: int = RETRIEVAL_CACHE_SIZE) -> None:
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._entries: OrderedDict[tuple[str, str], tuple[float, list[SearchResult]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple[str, str]) -> Optional[list[SearchResult]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            ts, results = entry
+            if time.time() - ts > self._ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return results
+
+    def put(self, key: tuple[str, str], results: list[SearchResult]) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), results)
+            self._entries.move_to_end(key)
+            cutoff = time.time() - self._ttl
+            while self._entries:
+                oldest_ts = next(iter(self._entries.values()))[0]
+                if len(self._entries) <= self._maxsize and oldest_ts >= cutoff:
+                    break
+                self._entries.popitem(last=False)
+
+
+_retrieval_cache = _RetrievalCache()
 
-MAX_CONTEXT_CHUNKS: int = int(os.environ.get("MAX_CONTEXT_CHUNKS", "5"))
+
+def _normalize_query(text: str) -> str:
+    """Lower-case, drop punctuation and collapse whitespace."""
+    return _SPACE_RE.sub(" ", _PUNCT_RE.sub(" ", text.lower())).strip()
 
 
 # ---------------------------------------------------------------------------
@@ -52,17 +112,19 @@ MAX_CONTEXT_CHUNKS: int = int(os.environ.get("MAX_CONTEXT_CHUNKS", "5"))
 # ---------------------------------------------------------------------------
 
 
-def _deduplicate(results: list[SearchResult], max_k: int) -> list[SearchResult]:
-    """Merge result lists, keeping only the first occurrence of each chunk id."""
-    seen: set[str] = set()
-    out: list[SearchResult] = []
-    for r in results:
-        if r.chunk.id not in seen:
-            seen.add(r.chunk.id)
-            out.append(r)
-        if len(out) >= max_k:
-            break
-    return out
+def _deduplicate(
+    semantic: list[SearchResult],
+    hybrid: list[SearchResult],
+    max_k: int,
+) -> list[SearchResult]:
+    """Merge result lists (semantic first), keeping the first occurrence of each chunk id."""
+    out: dict[str, SearchResult] = {}
+    for r in itertools.chain(semantic, hybrid):
+        if r.chunk.id not in out:
+            out[r.chunk.id] = r
+            if len(out) >= max_k:
+                break
+    return list(out.values())
 
 
 def _format_sources(results: list[SearchResult]) -> list[dict]:
@@ -78,35 +140,100 @@ def _format_sources(results: list[SearchResult]) -> list[dict]:
     ]
 
 
-async def _stream_llm_async(messages: list[dict]) -> AsyncGenerator[str, None]:
-    """
-    Bridge the synchronous HuggingFace streaming generator to an async generator.
+def _discard(task: asyncio.Task) -> None:
+    """Cancel a task whose result is no longer needed, retrieving any error it
+    already raised so asyncio doesn't log "Task exception was never retrieved"."""
+    task.cancel()
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
 
-    Runs the blocking HF call in a daemon thread and pushes tokens into an
-    asyncio.Queue that the async generator awaits.
+async def _retrieve(query: str) -> tuple[list[SearchResult], list[SearchResult]]:
     """
-    loop = asyncio.get_running_loop()
-    queue: asyncio.Queue[str | None] = asyncio.Queue()
-    exc_holder: list[Exception] = []
+    Run semantic and hybrid search concurrently.
 
-    def _run() -> None:
-        try:
-            for token in generate_response(messages):
-                loop.call_soon_threadsafe(queue.put_nowait, token)
-        except Exception as exc:  # noqa: BLE001
-            exc_holder.append(exc)
-        finally:
-            loop.call_soon_threadsafe(queue.put_nowait, None)  # sentinel
+    If semantic search alone already fills the context with strong matches
+    (>= STRONG_MATCH_THRESHOLD), the hybrid query is cancelled — it could not
+    change the prompt and would only add DB load.
+    """
+    hybrid_task = asyncio.create_task(ahybrid_search(query, None, 3))
+    try:
+        semantic_results = await asemantic_search(query, None, 5)
+    except BaseException:
+        _discard(hybrid_task)
+        raise
+
+    strong = sum(1 for r in semantic_results if r.similarity_score >= STRONG_MATCH_THRESHOLD)
+    if strong >= MAX_CONTEXT_CHUNKS:
+        _discard(hybrid_task)
+        return semantic_results, []
+    return semantic_results, await hybrid_task
+
+
+async def _coalesce_tokens(
+    tokens: AsyncGenerator[str, None],
+    interval: float = TOKEN_FLUSH_INTERVAL,
+    max_chars: int = TOKEN_FLUSH_CHARS,
+) -> AsyncGenerator[str, None]:
+    """
+    Re-chunk a token stream into larger pieces.
 
-    threading.Thread(target=_run, daemon=True).start()
+    A piece is flushed once it reaches *max_chars*, or *interval* seconds after
+    its first token arrived, whichever comes first. Whatever is
+    buffered is flushed when the stream ends; errors propagate after that.
 
-    while True:
-        token = await queue.get()
-        if token is None:
-            if exc_holder:
-                raise exc_holder[0]
-            return
-        yield token
+    The upstream generator is only pulled while this one is being iterated,
+    so a slow client never holds more than *max_chars* of buffered text —
+    backpressure reaches the HF stream without an intermediate queue.
+    """
+    loop = asyncio.get_running_loop()
+    it = tokens.__aiter__()
+    buf: list[str] = []
+    size = 0
+    deadline = 0.0
+    pending: asyncio.Future | None = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(it.__anext__())
+            timeout = max(0.0, deadline - loop.time()) if buf else None
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                # Window elapsed with tokens waiting — flush, keep awaiting.
+                yield "".join(buf)
+                buf.clear()
+                size = 0
+                continue
+
+            task, pending = pending, None
+            try:
+                token = task.result()
+            except StopAsyncIteration:
+                break
+            except Exception:
+                if buf:
+                    yield "".join(buf)
+                raise
+
+            if not buf:
+                deadline = loop.time() + interval
+            buf.append(token)
+            size += len(token)
+            if size >= max_chars:
+                yield "".join(buf)
+                buf.clear()
+                size = 0
+
+        if buf:
+            yield "".join(buf)
+    finally:
+        # Close the upstream deterministically: if the consumer stopped between
+        # pulls, generate_response_async is suspended inside its LLM slot and
+        # would otherwise hold it until garbage collection.
+        if pending is not None:
+            pending.cancel()
+            with contextlib.suppress(BaseException):
+                await pending
+        await it.aclose()
 
 
 # ---------------------------------------------------------------------------
@@ -122,25 +249,38 @@ async def handle_message(
     Full RAG → LLM → response pipeline as an async generator.
 
     Yields:
-        {"type": "token",  "content": "<text>"}  for each streamed token
+        {"type": "token",  "content": "<text>"}  for each coalesced run of tokens
         {"type": "done",   "sources": [...]}      as the final event
     """
     # Sanitise input
     user_message = user_message.strip()[:500]
+    if not user_message:
+        # Nothing to search for — skip retrieval and the LLM call entirely.
+        yield {"type": "token", "content": _EMPTY_INPUT_MSG}
+        yield {"type": "done", "sources": []}
+        return
 
     # ------------------------------------------------------------------
-    # 1. Retrieve context — run both searches concurrently in thread-pool
+    # 1. Retrieve context — per-session cache first, otherwise run both
+    #    searches concurrently (hybrid is dropped on strong semantic hits)
     # ------------------------------------------------------------------
-    try:
-        semantic_results, hybrid_results = await asyncio.gather(
-            asyncio.to_thread(semantic_search, user_message, None, 5),
-            asyncio.to_thread(hybrid_search, user_message, None, 3),
-        )
-    except Exception as exc:
-        logger.error("Search failed: %s", exc)
-        semantic_results, hybrid_results = [], []
-
-    merged = _deduplicate(semantic_results + hybrid_results, max_k=MAX_CONTEXT_CHUNKS)
+    cache_key = (session_id, _normalize_query(user_message))
+    merged = _retrieval_cache.get(cache_key)
+    if merged is None:
+        try:
+            semantic_results, hybrid_results = await _retrieve(user_message)
+        except Exception as exc:
+            logger.error("Search failed: %s", exc)
+            semantic_results, hybrid_results = [], []
+            search_ok = False
+        else:
+            search_ok = True
+
+        merged = _deduplicate(semantic_results, hybrid_results, max_k=MAX_CONTEXT_CHUNKS)
+        if search_ok:
+            _retrieval_cache.put(cache_key, merged)
+    else:
+        logger.debug("[%s] Retrieval cache hit", session_id)
 
     # ------------------------------------------------------------------
     # 2. Build prompt
@@ -148,28 +288,30 @@ async def handle_message(
     history = conversation_store.get(session_id)
     messages = build_messages(user_message, merged, history)
 
-    logger.info(
-        "[%s] PROMPT MESSAGES (%d):\n%s",
-        session_id,
-        len(messages),
-        "\n".join(
-            f"  [{m['role'].upper()}] {m['content'][:300]}{'...' if len(m['content']) > 300 else ''}"
-            for m in messages
-        ),
-    )
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "[%s] PROMPT MESSAGES (%d):\n%s",
+            session_id,
+            len(messages),
+            "\n".join(
+                f"  [{m['role'].upper()}] {m['content'][:300]}{'...' if len(m['content']) > 300 else ''}"
+                for m in messages
+            ),
+        )
 
     # ------------------------------------------------------------------
     # 3. Stream from Llama
     # ------------------------------------------------------------------
-    full_response = ""
+    parts: list[str] = []
     try:
-        async for token in _stream_llm_async(messages):
-            full_response += token
-            yield {"type": "token", "content": token}
+        async for piece in _coalesce_tokens(generate_response_async(messages)):
+            parts.append(piece)
+            yield {"type": "token", "content": piece}
     except Exception as exc:
         logger.error("LLM streaming failed: %s", exc)
         yield {"type": "token", "content": _FALLBACK_MSG}
-        full_response = _FALLBACK_MSG
+        parts = [_FALLBACK_MSG]
+    full_response = "".join(parts)
 
     # ------------------------------------------------------------------
     # 4. Fallback CTAs (appended after LLM response if needed)
@@ -3,54 +3,84 @@ In-memory conversation store keyed by session_id.
 
 - Sessions expire after SESSION_TIMEOUT seconds of inactivity.
 - MAX_CONVERSATION_TURNS most-recent turns are retained per session.
-- Thread-safe with a Lock (FastAPI runs async but sync code runs in threads).
+- At most MAX_SESSIONS sessions are kept; the least recently used is evicted.
+- Thread-safe: a short-held store lock guards the session map, and each
+  session has its own lock for its message list, so concurrent requests for
+  different sessions only contend on the map lookup.
 """
 
 from __future__ import annotations
 
+import itertools
 import os
 import threading
 import time
+from collections import OrderedDict, deque
 from dataclasses import dataclass, field
+from typing import Optional
 
-SESSION_TIMEOUT: int = 30 * 60  # 30 minutes
+SESSION_TIMEOUT: int = int(os.environ.get("SESSION_TIMEOUT", str(30 * 60)))  # seconds
 MAX_CONVERSATION_TURNS: int = int(os.environ.get("MAX_CONVERSATION_TURNS", "10"))
+MAX_SESSIONS: int = int(os.environ.get("MAX_SESSIONS", "10000"))
 
 
 @dataclass
 class _Session:
-    messages: list[dict] = field(default_factory=list)
+    # Keeps only the last N complete turns (each turn = 1 user + 1 assistant msg);
+    # appends past the limit drop the oldest message in O(1).
+    messages: deque[dict] = field(
+        default_factory=lambda: deque(maxlen=MAX_CONVERSATION_TURNS * 2)
+    )
     last_active: float = field(default_factory=time.time)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
 
 
 class ConversationStore:
     """Thread-safe in-memory store for per-session message history."""
 
     def __init__(self) -> None:
-        self._sessions: dict[str, _Session] = {}
+        # Ordered least → most recently active, so expiry and LRU eviction
+        # only ever touch the front of the map.
+        self._sessions: OrderedDict[str, _Session] = OrderedDict()
         self._lock = threading.Lock()
 
-    def get(self, session_id: str) -> list[dict]:
-        """Return a copy of the message list for *session_id* (empty list if unknown)."""
+    def _touch(self, session_id: str, create: bool) -> Optional[_Session]:
+        """Look up *session_id*, mark it most recently active, optionally creating it."""
         with self._lock:
             session = self._sessions.get(session_id)
             if session is None:
-                return []
+                if not create:
+                    return None
+                session = self._sessions[session_id] = _Session()
+                while len(self._sessions) > MAX_SESSIONS:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
             session.last_active = time.time()
+            return session
+
+    def get(self, session_id: str) -> list[dict]:
+        """Return a copy of the message list for *session_id* (empty list if unknown)."""
+        session = self._touch(session_id, create=False)
+        if session is None:
+            return []
+        with session.lock:
             return list(session.messages)
 
+    def get_recent(self, session_id: str, n: int) -> list[dict]:
+        """Return a copy of only the last *n* messages for *session_id*."""
+        session = self._touch(session_id, create=False)
+        if session is None:
+            return []
+        with session.lock:
+            msgs = session.messages
+            return list(itertools.islice(msgs, max(0, len(msgs) - n), None))
+
     def add(self, session_id: str, role: str, content: str) -> None:
         """Append a message to *session_id*, trimming history to MAX_CONVERSATION_TURNS."""
-        with self._lock:
-            if session_id not in self._sessions:
-                self._sessions[session_id] = _Session()
-            session = self._sessions[session_id]
+        session = self._touch(session_id, create=True)
+        with session.lock:
             session.messages.append({"role": role, "content": content})
-            # Keep only the last N complete turns (each turn = 1 user + 1 assistant msg)
-            max_msgs = MAX_CONVERSATION_TURNS * 2
-            if len(session.messages) > max_msgs:
-                session.messages = session.messages[-max_msgs:]
-            session.last_active = time.time()
 
     def clear(self, session_id: str) -> None:
         """Delete the session entirely."""
@@ -60,11 +90,23 @@ class ConversationStore:
     def cleanup_expired(self) -> int:
         """Remove sessions that have been idle longer than SESSION_TIMEOUT. Returns count removed."""
         cutoff = time.time() - SESSION_TIMEOUT
+        removed = 0
+        with self._lock:
+            while self._sessions:
+                oldest = next(iter(self._sessions.values()))
+                if oldest.last_active >= cutoff:
+                    break
+                self._sessions.popitem(last=False)
+                removed += 1
+        return removed
+
+    def next_expiry(self) -> Optional[float]:
+        """Seconds until the least recently active session expires (None if empty)."""
         with self._lock:
-            expired = [sid for sid, s in self._sessions.items() if s.last_active < cutoff]
-            for sid in expired:
-                del self._sessions[sid]
-        return len(expired)
+            if not self._sessions:
+                return None
+            oldest = next(iter(self._sessions.values()))
+            return oldest.last_active + SESSION_TIMEOUT - time.time()
 
 
 # Module-level singleton shared across the whole server process.
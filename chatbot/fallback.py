@@ -28,19 +28,42 @@ LOW_SIMILARITY_THRESHOLD = 0.50
 # Intent patterns (compiled once at import time)
 # ---------------------------------------------------------------------------
 
-_BOOKING_RE = re.compile(
-    r"\b(book(?:ing)?|purchase|buy|reserve|ticket|admission|sign[\s-]?up|register)\b",
+_INTENT_PATTERNS: dict[str, str] = {
+    "booking": r"\b(?:book(?:ing)?|purchase|buy|reserve|ticket|admission|sign[\s-]?up|register)\b",
+    "custom": r"\b(?:custom|corporate|large\s+group|special\s+(?:event|request|accommodat)|private\s+(?:party|event|session))\b",
+    "other_location": r"\b(?:oakville|london|st\.?\s*catharines|other\s+location|another\s+location|different\s+location)\b",
+}
+
+# One alternation with a named group per intent: a single scan of the message.
+_INTENT_RE = re.compile(
+    "|".join(f"(?P<{name}>{pat})" for name, pat in _INTENT_PATTERNS.items()),
     re.IGNORECASE,
 )
-_CUSTOM_EVENT_RE = re.compile(
-    r"\b(custom|corporate|large\s+group|special\s+(event|request|accommodat)|private\s+(party|event|session))\b",
-    re.IGNORECASE,
-)
-_OTHER_LOCATION_RE = re.compile(
-    r"\b(oakville|london|st\.?\s*catharines|other\s+location|another\s+location|different\s+location)\b",
-    re.IGNORECASE,
+
+# ---------------------------------------------------------------------------
+# CTA strings (formatted once at import time)
+# ---------------------------------------------------------------------------
+
+_NO_INFO_CTA = (
+    "\n\nI wasn't able to find specific information about that in my knowledge base. "
+    f"For accurate details please call us at **{PHONE}** (press 3 for the park) "
+    f"or email **{EMAIL}** — we're happy to help!"
 )
 
+# Ordered by priority; keys match the _INTENT_RE group names.
+_INTENT_CTAS: dict[str, str] = {
+    "booking": f"Ready to book? Head to [{BOOKING_URL}]({BOOKING_URL}) to secure your spot!",
+    "custom": (
+        f"For custom arrangements please email **{EMAIL}** "
+        f"or call **{PHONE}** and our events team will take care of you."
+    ),
+    "other_location": (
+        f"I only have information for the Scarborough location — "
+        f"for other parks please visit [{BOOKING_URL}]({BOOKING_URL}) "
+        f"or call the specific park directly."
+    ),
+}
+
 
 # ---------------------------------------------------------------------------
 # Public API
@@ -64,36 +87,16 @@ def detect_fallback(
     """
     # --- Rule 1: no or low-confidence RAG results ---
     if not rag_results or rag_results[0].similarity_score < LOW_SIMILARITY_THRESHOLD:
-        return (
-            "\n\nI wasn't able to find specific information about that in my knowledge base. "
-            f"For accurate details please call us at **{PHONE}** (press 3 for the park) "
-            f"or email **{EMAIL}** — we're happy to help!"
-        )
-
-    ctas: list[str] = []
-
-    # --- Rule 2: booking intent ---
-    if _BOOKING_RE.search(user_message):
-        ctas.append(
-            f"Ready to book? Head to [{BOOKING_URL}]({BOOKING_URL}) to secure your spot!"
-        )
-
-    # --- Rule 3: custom / large-group events ---
-    if _CUSTOM_EVENT_RE.search(user_message):
-        ctas.append(
-            f"For custom arrangements please email **{EMAIL}** "
-            f"or call **{PHONE}** and our events team will take care of you."
-        )
-
-    # --- Rule 4: other location ---
-    if _OTHER_LOCATION_RE.search(user_message):
-        ctas.append(
-            f"I only have information for the Scarborough location — "
-            f"for other parks please visit [{BOOKING_URL}]({BOOKING_URL}) "
-            f"or call the specific park directly."
-        )
-
-    if ctas:
-        return "\n\n" + "  \n".join(ctas)
+        return _NO_INFO_CTA
+
+    # --- Rules 2–4: one pass over the message collects every intent ---
+    found: set[str] = set()
+    for m in _INTENT_RE.finditer(user_message):
+        found.add(m.lastgroup)
+        if len(found) == len(_INTENT_CTAS):
+            break
+
+    if found:
+        return "\n\n" + "  \n".join(cta for name, cta in _INTENT_CTAS.items() if name in found)
 
     return None
@@ -5,23 +5,34 @@ Uses huggingface_hub.InferenceClient with the OpenAI-compatible chat-completions
 API, streaming via SSE.
 
 Key design decisions:
-- One fresh InferenceClient per call (lightweight, avoids stale state).
-- Sync generator for tokens — chat_handler.py bridges to async via threading.
+- One shared client per process (sync and async), so HTTP connections to the
+  provider are kept alive across requests. reload_client() rebuilds them from
+  the environment; set_client() swaps in a stand-in (e.g. for tests).
+- Async generator for tokens (AsyncInferenceClient) — chat_handler.py iterates it
+  directly on the event loop; the sync generator remains for non-async callers.
 - 3 attempts with exponential backoff on 429 / 503.
+- Async streams are admitted through a process-wide semaphore (LLM_MAX_CONC).
 - HF_PROVIDER env var is optional; empty string → auto-routing.
 """
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
 import time
-from typing import Generator
+from typing import AsyncGenerator, Generator, Optional
 
-from huggingface_hub import InferenceClient
+from huggingface_hub import AsyncInferenceClient, InferenceClient
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on concurrent streaming calls to the provider across all chat,
+# SSE and voice sessions in this process; excess requests queue here instead
+# of turning into 429s upstream.
+LLM_MAX_CONCURRENCY: int = int(os.environ.get("LLM_MAX_CONC", "16"))
+_LLM_SLOTS = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
 _FALLBACK_MSG = (
     "I'm having trouble connecting right now. "
     "Please try again in a moment, or call us at **289-454-5555** for immediate help!"
@@ -34,6 +45,62 @@ def _make_client() -> InferenceClient:
     return InferenceClient(api_key=token, provider=provider)
 
 
+def _make_async_client() -> AsyncInferenceClient:
+    token = os.environ.get("HF_TOKEN")
+    provider = os.environ.get("HF_PROVIDER") or None  # "" → None → auto-route
+    return AsyncInferenceClient(api_key=token, provider=provider)
+
+
+_client: Optional[InferenceClient] = None
+_async_client: Optional[AsyncInferenceClient] = None
+
+
+def get_client() -> InferenceClient:
+    """Return the shared sync InferenceClient, creating it on first call."""
+    global _client
+    if _client is None:
+        _client = _make_client()
+    return _client
+
+
+def get_async_client() -> AsyncInferenceClient:
+    """Return the shared AsyncInferenceClient, creating it on first call."""
+    global _async_client
+    if _async_client is None:
+        _async_client = _make_async_client()
+    return _async_client
+
+
+def set_client(
+    client: Optional[InferenceClient] = None,
+    async_client: Optional[AsyncInferenceClient] = None,
+) -> None:
+    """Replace the shared clients (None leaves that client to be rebuilt lazily)."""
+    global _client, _async_client
+    _client = client
+    _async_client = async_client
+
+
+def reload_client() -> None:
+    """Drop the shared clients so the next call re-reads HF_TOKEN / HF_PROVIDER."""
+    set_client(None, None)
+
+
+async def close_clients() -> None:
+    """Close the shared async client's HTTP session (call on server shutdown)."""
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+
+
+def _status_code(exc: Exception) -> int:
+    resp = getattr(exc, "response", None)
+    if resp is None:
+        return 0
+    return getattr(resp, "status_code", None) or getattr(resp, "status", 0) or 0
+
+
 def generate_response(messages: list[dict]) -> Generator[str, None, None]:
     """
     Streaming token generator.
@@ -47,7 +114,7 @@ def generate_response(messages: list[dict]) -> Generator[str, None, None]:
 
     for attempt in range(3):
         try:
-            client = _make_client()
+            client = get_client()
             stream = client.chat.completions.create(
                 model=model,
                 messages=messages,
@@ -68,8 +135,7 @@ def generate_response(messages: list[dict]) -> Generator[str, None, None]:
             return  # success — stop retry loop
 
         except Exception as exc:
-            resp = getattr(exc, "response", None)
-            status = getattr(resp, "status_code", 0) if resp else 0
+            status = _status_code(exc)
             if status in (429, 503) and attempt < 2:
                 logger.warning(
                     "HuggingFace rate-limited (HTTP %s), retry %d/2 in %.1fs",
@@ -84,6 +150,54 @@ def generate_response(messages: list[dict]) -> Generator[str, None, None]:
                 raise
 
 
+async def generate_response_async(messages: list[dict]) -> AsyncGenerator[str, None]:
+    """
+    Async streaming token generator — same contract as generate_response().
+
+    Iterates the AsyncInferenceClient SSE stream natively on the event loop,
+    so no thread or queue sits between the HTTP stream and the caller.
+    """
+    model = os.environ.get("HF_MODEL", "meta-llama/Llama-3.1-8B-Instruct")
+    delay = 1.0
+
+    for attempt in range(3):
+        try:
+            # Hold an upstream slot only while streaming; backoff sleeps release it.
+            async with _LLM_SLOTS:
+                client = get_async_client()
+                stream = await client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    stream=True,
+                    max_tokens=1024,
+                    temperature=0.3,
+                    top_p=0.9,
+                )
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta
+                    token = getattr(delta, "content", None)
+                    if token:
+                        yield token
+            return  # success — stop retry loop
+
+        except Exception as exc:
+            status = _status_code(exc)
+            if status in (429, 503) and attempt < 2:
+                logger.warning(
+                    "HuggingFace rate-limited (HTTP %s), retry %d/2 in %.1fs",
+                    status,
+                    attempt + 1,
+                    delay,
+                )
+                await asyncio.sleep(delay)
+                delay *= 2
+            else:
+                logger.error("HuggingFace API error (attempt %d): %s", attempt + 1, exc)
+                raise
+
+
 def generate_response_sync(messages: list[dict]) -> str:
     """Non-streaming convenience wrapper — collects the full response into a string."""
     return "".join(generate_response(messages))
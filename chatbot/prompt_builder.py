@@ -84,11 +84,29 @@ This is a voice-first experience.
 Your responses should sound good when spoken out loud and feel like a real back-and-forth conversation.
 """
 
+# Shared by every request — callers must not mutate the returned message dicts.
+_SYSTEM_MSG: dict = {"role": "system", "content": SYSTEM_PROMPT}
+
+_CTX_HEADER = "KNOWLEDGE BASE CONTEXT:\n\n"
+
+_EMPTY_CONTEXT_MSG = (
+    _CTX_HEADER
+    + "No matching context was found for this query. "
+    "Answer honestly that you don't have that specific information "
+    "and direct the user to call 289-454-5555 or email events.scb@aerosportsparks.ca."
+)
+
 # ---------------------------------------------------------------------------
 # Builder
 # ---------------------------------------------------------------------------
 
 
+def _format_excerpt(i: int, result) -> str:
+    """One numbered knowledge-base excerpt, followed by a blank line."""
+    c = result.chunk
+    return f"[{i}] {c.category} > {c.subcategory}\nQ: {c.question}\nA: {c.answer}\n"
+
+
 def build_messages(
     user_message: str,
     rag_context: list,  # list[SearchResult]
@@ -102,27 +120,21 @@ def build_messages(
         [system: KNOWLEDGE BASE CONTEXT ...]
         [...trimmed conversation history...]
         [user: user_message]
+
+    The system-prompt dict is a shared module constant, so the returned list
+    is read-only as far as callers are concerned (the HF client only
+    serialises it).
     """
     # Format RAG context as numbered, labelled excerpts
     if rag_context:
-        lines = ["KNOWLEDGE BASE CONTEXT:\n"]
-        for i, result in enumerate(rag_context, 1):
-            c = result.chunk
-            lines.append(f"[{i}] {c.category} > {c.subcategory}")
-            lines.append(f"Q: {c.question}")
-            lines.append(f"A: {c.answer}")
-            lines.append("")
-        context_text = "\n".join(lines)
-    else:
-        context_text = (
-            "KNOWLEDGE BASE CONTEXT:\n\n"
-            "No matching context was found for this query. "
-            "Answer honestly that you don't have that specific information "
-            "and direct the user to call 289-454-5555 or email events.scb@aerosportsparks.ca."
+        context_text = _CTX_HEADER + "\n".join(
+            _format_excerpt(i, result) for i, result in enumerate(rag_context, 1)
         )
+    else:
+        context_text = _EMPTY_CONTEXT_MSG
 
     messages: list[dict] = [
-        {"role": "system", "content": SYSTEM_PROMPT},
+        _SYSTEM_MSG,
         {"role": "system", "content": context_text},
     ]
 
@@ -17,19 +17,24 @@ GET /static/*  → chatbot/static/           (CSS / JS assets)
 Run
 ---
     uvicorn chatbot.server:app --host 0.0.0.0 --port 8000 --reload
+
+    # production (Linux): libuv event loop + C HTTP parser
+    uvicorn chatbot.server:app --host 0.0.0.0 --port 8000 --loop uvloop --http httptools
 """
 
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
 import os
 import sys
+import time
 import uuid
 from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from typing import Optional
 
+import orjson
 from dotenv import load_dotenv
 
 # Load .env before any other local imports so all env vars are available.
@@ -41,15 +46,16 @@ if _REPO_ROOT not in sys.path:
     sys.path.insert(0, _REPO_ROOT)
 
 import config  # noqa: E402  (loads DB pool, embedding config, etc.)
+import embedding as emb  # noqa: E402
 from fastapi import FastAPI, Form, Query, WebSocket, WebSocketDisconnect  # noqa: E402
 from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
-from fastapi.responses import FileResponse, JSONResponse, Response  # noqa: E402
+from fastapi.responses import JSONResponse, Response, StreamingResponse  # noqa: E402
 from fastapi.staticfiles import StaticFiles  # noqa: E402
 from pydantic import BaseModel  # noqa: E402
-from sse_starlette.sse import EventSourceResponse  # noqa: E402
 
 from chatbot.chat_handler import handle_message  # noqa: E402
-from chatbot.conversation import conversation_store  # noqa: E402
+from chatbot.conversation import SESSION_TIMEOUT, conversation_store  # noqa: E402
+from chatbot.llm import close_clients  # noqa: E402
 from twilio.twiml.voice_response import VoiceResponse  # noqa: E402
 
 logging.basicConfig(
@@ -61,15 +67,56 @@ logger = logging.getLogger(__name__)
 _STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
 
 
+def _dumps(obj) -> str:
+    """Serialise a payload for SSE / WebSocket text frames (orjson, compact)."""
+    return orjson.dumps(obj).decode()
+
+
+def _sse_frame(obj) -> bytes:
+    """
+    One complete SSE event as bytes. orjson never emits raw newlines, so the
+    payload always fits on a single ``data:`` line.
+    """
+    return b"data: " + orjson.dumps(obj) + b"\n\n"
+
+
+# Keep reverse proxies (nginx, Cloudflare) from buffering streamed tokens.
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+# Comment-line keep-alive on idle SSE streams (slow first token, long
+# generations) so proxies don't drop the connection mid-answer.
+SSE_PING_INTERVAL: int = int(os.environ.get("SSE_PING_SECONDS", "15"))
+_SSE_PING = b": ping\n\n"
+
+# Maximum frames buffered per stream ahead of a slow client.
+SSE_QUEUE_SIZE: int = 32
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (FastAPI's own class is deprecated upstream)."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
 # ---------------------------------------------------------------------------
 # Lifespan (startup / shutdown)
 # ---------------------------------------------------------------------------
 
 
 async def _session_cleanup_loop() -> None:
-    """Purge expired sessions every 5 minutes."""
+    """
+    Purge expired sessions, waking only when the oldest one is due.
+
+    Sessions created while asleep expire no earlier than the current oldest,
+    so an empty store can safely sleep a full SESSION_TIMEOUT.
+    """
     while True:
-        await asyncio.sleep(5 * 60)
+        delay = conversation_store.next_expiry()
+        await asyncio.sleep(SESSION_TIMEOUT if delay is None else max(1.0, delay))
         n = conversation_store.cleanup_expired()
         if n:
             logger.info("Cleaned up %d expired session(s)", n)
@@ -79,15 +126,21 @@ async def _session_cleanup_loop() -> None:
 async def lifespan(app: FastAPI):
     logger.info("AeroBot server starting…")
 
-    # Verify database connectivity
+    # Warm the asyncpg pool used by the request path and verify connectivity.
+    # The psycopg2 pool is only created if something sync (e.g. sync.py) needs it.
     try:
-        pool = config.get_db_pool()
-        conn = pool.getconn()
-        pool.putconn(conn)
+        async_pool = await config.get_async_pool()
+        await async_pool.fetchval("SELECT 1")
         logger.info("Database connection verified")
     except Exception as exc:
         logger.warning("Database connection failed on startup: %s", exc)
 
+    # Load the embedding model / open the Voyage connection before the first query.
+    try:
+        await asyncio.to_thread(emb.warm_up)
+    except Exception as exc:
+        logger.warning("Embedding warm-up failed: %s", exc)
+
     # Optional: run Google Sheets sync on startup
     if os.environ.get("SYNC_ON_STARTUP", "").lower() == "true":
         try:
@@ -104,6 +157,8 @@ async def lifespan(app: FastAPI):
     yield  # ← server runs here
 
     cleanup_task.cancel()
+    await close_clients()
+    await config.close_async_pool()
     config.close_db_pool()
     logger.info("AeroBot server stopped")
 
@@ -117,6 +172,7 @@ app = FastAPI(
     description="Customer chatbot for AeroSports Scarborough",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS — restrict origins in production via CHATBOT_CORS_ORIGINS env var.
@@ -152,14 +208,25 @@ class ResetRequest(BaseModel):
 # ---------------------------------------------------------------------------
 
 
+def _read_static(name: str) -> bytes:
+    with open(os.path.join(_STATIC_DIR, name), "rb") as f:
+        return f.read()
+
+
+# The two HTML pages are tiny and fixed per deploy — read once, serve from memory.
+_INDEX_HTML = _read_static("index.html")
+_WIDGET_HTML = _read_static("widget.html")
+_HTML_HEADERS = {"Cache-Control": "public, max-age=300"}
+
+
 @app.get("/", include_in_schema=False)
 async def index():
-    return FileResponse(os.path.join(_STATIC_DIR, "index.html"))
+    return Response(content=_INDEX_HTML, media_type="text/html", headers=_HTML_HEADERS)
 
 
 @app.get("/widget", include_in_schema=False)
 async def widget():
-    return FileResponse(os.path.join(_STATIC_DIR, "widget.html"))
+    return Response(content=_WIDGET_HTML, media_type="text/html", headers=_HTML_HEADERS)
 
 
 # ---------------------------------------------------------------------------
@@ -176,20 +243,23 @@ async def chat_endpoint(body: ChatRequest):
     Useful for testing and non-streaming clients.
     """
     session_id = body.session_id or str(uuid.uuid4())
-    full_response = ""
+    parts: list[str] = []
     sources: list = []
 
     async for item in handle_message(session_id, body.message):
         if item["type"] == "token":
-            full_response += item["content"]
+            parts.append(item["content"])
         elif item["type"] == "done":
             sources = item["sources"]
-
-    return {
-        "response": full_response,
-        "session_id": session_id,
-        "sources": sources,
-    }
+    full_response = "".join(parts)
+
+    # Payload is plain str/list/dict — serialise once and skip jsonable_encoder.
+    return Response(
+        content=orjson.dumps(
+            {"response": full_response, "session_id": session_id, "sources": sources}
+        ),
+        media_type="application/json",
+    )
 
 
 @app.get("/api/chat/stream")
@@ -208,16 +278,15 @@ async def chat_stream(
     """
     sid = session_id or str(uuid.uuid4())
 
-    async def _generator():
+    async def _produce(queue: asyncio.Queue) -> None:
         try:
             async for item in handle_message(sid, message):
                 if item["type"] == "token":
-                    payload = json.dumps(
+                    frame = _sse_frame(
                         {"token": item["content"], "done": False, "session_id": sid}
                     )
-                    yield {"data": payload}
                 elif item["type"] == "done":
-                    payload = json.dumps(
+                    frame = _sse_frame(
                         {
                             "token": "",
                             "done": True,
@@ -225,40 +294,91 @@ async def chat_stream(
                             "sources": item["sources"],
                         }
                     )
-                    yield {"data": payload}
+                else:
+                    continue
+                await queue.put(frame)  # blocks once the client falls behind
         except Exception as exc:
             logger.error("SSE stream error: %s", exc)
-            payload = json.dumps(
-                {"token": "", "done": True, "session_id": sid, "error": str(exc), "sources": []}
+            await queue.put(
+                _sse_frame(
+                    {"token": "", "done": True, "session_id": sid, "error": str(exc), "sources": []}
+                )
             )
-            yield {"data": payload}
+        await queue.put(None)  # end of stream (skipped if cancelled)
+
+    async def _generator():
+        # The LLM keeps streaming while a frame is being written, but never
+        # more than SSE_QUEUE_SIZE frames ahead of the socket.
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SSE_QUEUE_SIZE)
+        producer = asyncio.create_task(_produce(queue))
+        try:
+            while True:
+                try:
+                    frame = await asyncio.wait_for(queue.get(), SSE_PING_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield _SSE_PING
+                    continue
+                if frame is None:
+                    break
+                yield frame
+        finally:
+            producer.cancel()
 
-    return EventSourceResponse(_generator())
+    return StreamingResponse(_generator(), media_type="text/event-stream", headers=_SSE_HEADERS)
 
 
 @app.post("/api/chat/reset")
 async def reset_session(body: ResetRequest):
     """Clear conversation history for the given session."""
     conversation_store.clear(body.session_id)
-    return {"status": "ok", "session_id": body.session_id}
+    return Response(
+        content=orjson.dumps({"status": "ok", "session_id": body.session_id}),
+        media_type="application/json",
+    )
+
+
+# Health probes (LB / k8s liveness) hit the DB at most once per window;
+# concurrent callers share the single in-flight probe.
+HEALTH_CACHE_TTL: float = 5.0
+# A hung DB or exhausted pool reports degraded instead of queueing every
+# health call behind the lock.
+HEALTH_PROBE_TIMEOUT: float = 2.0
+_health_cache: Optional[tuple[float, bool]] = None
+_health_lock = asyncio.Lock()
+
+
+async def _select_one() -> None:
+    async_pool = await config.get_async_pool()
+    async with async_pool.acquire() as conn:
+        await conn.execute("SELECT 1")
+
+
+async def _probe_db() -> bool:
+    try:
+        await asyncio.wait_for(_select_one(), HEALTH_PROBE_TIMEOUT)
+        return True
+    except Exception:  # includes asyncio.TimeoutError
+        return False
+
+
+async def _db_ok() -> bool:
+    global _health_cache
+    async with _health_lock:
+        if _health_cache and time.monotonic() - _health_cache[0] < HEALTH_CACHE_TTL:
+            return _health_cache[1]
+        ok = await _probe_db()
+        _health_cache = (time.monotonic(), ok)
+        return ok
 
 
 @app.get("/api/health")
 async def health():
     """Health check — reports DB connectivity and whether HF_TOKEN is configured."""
-    db_ok = False
-    try:
-        pool = config.get_db_pool()
-        conn = pool.getconn()
-        pool.putconn(conn)
-        db_ok = True
-    except Exception:
-        pass
-
+    db_ok = await _db_ok()
     hf_ok = bool(os.environ.get("HF_TOKEN"))
 
     status = "ok" if (db_ok and hf_ok) else "degraded"
-    return JSONResponse(
+    return ORJSONResponse(
         content={"status": status, "db": db_ok, "hf_token_configured": hf_ok},
         status_code=200 if status == "ok" else 503,
     )
@@ -303,6 +423,57 @@ async def voice_action():
     return Response(content=str(vr), media_type="text/xml")
 
 
+@dataclass
+class _RelayCall:
+    """Per-connection state for one ConversationRelay WebSocket."""
+
+    websocket: WebSocket
+    call_sid: Optional[str] = None
+    interrupted: bool = False
+
+
+async def _relay_setup(msg: dict, call: _RelayCall) -> None:
+    call.call_sid = msg.get("callSid", str(uuid.uuid4()))
+    logger.info("ConversationRelay connected: %s from %s", call.call_sid, msg.get("from"))
+
+
+async def _relay_prompt(msg: dict, call: _RelayCall) -> None:
+    user_text = msg.get("voicePrompt", "").strip()
+    if not user_text or not call.call_sid:
+        return
+
+    logger.info("[%s] User said: %s", call.call_sid, user_text)
+    call.interrupted = False
+
+    async for item in handle_message(call.call_sid, user_text):
+        if call.interrupted:
+            break
+        if item["type"] == "token":
+            await call.websocket.send_text(
+                _dumps({"type": "text", "token": item["content"], "last": False})
+            )
+        elif item["type"] == "done":
+            await call.websocket.send_text(_dumps({"type": "text", "token": "", "last": True}))
+
+
+async def _relay_interrupt(msg: dict, call: _RelayCall) -> None:
+    logger.info("[%s] User interrupted", call.call_sid)
+    call.interrupted = True
+
+
+async def _relay_dtmf(msg: dict, call: _RelayCall) -> None:
+    logger.info("[%s] DTMF: %s", call.call_sid, msg.get("digit"))
+
+
+# ConversationRelay message type → handler; unknown types are ignored.
+_RELAY_HANDLERS = {
+    "setup": _relay_setup,
+    "prompt": _relay_prompt,
+    "interrupt": _relay_interrupt,
+    "dtmf": _relay_dtmf,
+}
+
+
 @app.websocket("/voice/ws")
 async def voice_ws(websocket: WebSocket):
     """
@@ -312,53 +483,19 @@ async def voice_ws(websocket: WebSocket):
     real time. Twilio handles ASR (speech→text) and TTS (text→speech).
     """
     await websocket.accept()
-    call_sid: str | None = None
-    interrupted = False
+    call = _RelayCall(websocket)
 
     try:
         async for raw in websocket.iter_text():
-            msg = json.loads(raw)
-            msg_type = msg.get("type")
-
-            if msg_type == "setup":
-                call_sid = msg.get("callSid", str(uuid.uuid4()))
-                logger.info(
-                    "ConversationRelay connected: %s from %s",
-                    call_sid,
-                    msg.get("from"),
-                )
-
-            elif msg_type == "prompt":
-                user_text = msg.get("voicePrompt", "").strip()
-                if not user_text or not call_sid:
-                    continue
-
-                logger.info("[%s] User said: %s", call_sid, user_text)
-                interrupted = False
-
-                async for item in handle_message(call_sid, user_text):
-                    if interrupted:
-                        break
-                    if item["type"] == "token":
-                        await websocket.send_text(
-                            json.dumps({"type": "text", "token": item["content"], "last": False})
-                        )
-                    elif item["type"] == "done":
-                        await websocket.send_text(
-                            json.dumps({"type": "text", "token": "", "last": True})
-                        )
-
-            elif msg_type == "interrupt":
-                logger.info("[%s] User interrupted", call_sid)
-                interrupted = True
-
-            elif msg_type == "dtmf":
-                logger.info("[%s] DTMF: %s", call_sid, msg.get("digit"))
+            msg = orjson.loads(raw)
+            handler = _RELAY_HANDLERS.get(msg.get("type"))
+            if handler is not None:
+                await handler(msg, call)
 
     except WebSocketDisconnect:
-        logger.info("ConversationRelay disconnected: %s", call_sid)
+        logger.info("ConversationRelay disconnected: %s", call.call_sid)
     except Exception as exc:
-        logger.error("ConversationRelay error [%s]: %s", call_sid, exc)
+        logger.error("ConversationRelay error [%s]: %s", call.call_sid, exc)
     finally:
-        if call_sid:
-            conversation_store.clear(call_sid)
+        if call.call_sid:
+            conversation_store.clear(call.call_sid)
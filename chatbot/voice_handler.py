@@ -8,32 +8,30 @@ Mirrors chat_handler.py but adapted for phone calls:
 - max_tokens=150 for faster, concise TTS responses
 
 Actual API shapes (verified against existing code):
-  search:       hybrid_search(query, category, top_k)  / semantic_search(...)
-  conversation: conversation_store.get(session_id) → list[dict]
+  search:       ahybrid_search(query, category, top_k)  / asemantic_search(...)
+  conversation: conversation_store.get_recent(session_id, n) → list[dict]
                 conversation_store.add(session_id, role, content)
-  llm:          _make_client() + client.chat.completions.create(stream=False)
+  llm:          get_client() + client.chat.completions.create(stream=False)
 """
 
 from __future__ import annotations
 
 import asyncio
+import itertools
 import logging
 import os
 import re
-import sys
 
-# Same sys.path guard used by chat_handler.py — lets us import flat RAG modules.
-_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-if _REPO_ROOT not in sys.path:
-    sys.path.insert(0, _REPO_ROOT)
+from models import SearchResult
+from search import ahybrid_search, asemantic_search
 
-from search import hybrid_search, semantic_search  # noqa: E402
-
-from chatbot.conversation import conversation_store  # noqa: E402
-from chatbot.llm import _make_client  # noqa: E402
+from chatbot.conversation import conversation_store
+from chatbot.llm import get_client
 
 logger = logging.getLogger(__name__)
 
+_HF_MODEL = os.environ.get("HF_MODEL", "meta-llama/Llama-3.1-8B-Instruct")
+
 # ---------------------------------------------------------------------------
 # Voice-specific system prompt (replaces the web-chat SYSTEM_PROMPT)
 # ---------------------------------------------------------------------------
@@ -53,21 +51,38 @@ _VOICE_FALLBACK = (
     "Please call us directly at 289-454-5555."
 )
 
+# Reuse existing history — keep last 10 turns (20 messages) max
+_VOICE_HISTORY_MESSAGES = 20
+
+_NO_CONTEXT_TEXT = (
+    "KNOWLEDGE BASE CONTEXT:\n\n"
+    "No matching context was found for this query. "
+    "Direct the caller to phone 289-454-5555 or email events.scb@aerosportsparks.ca."
+)
+
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
+# TTS cleanup patterns, compiled once — _clean_for_tts runs on every voice turn.
+# Asterisks, headings and backticks are fused into one pass: deleting every
+# "*" before matching "#+\s*" is the same as letting a heading run swallow
+# the asterisks and whitespace after its "#". Links, bullets and newlines stay
+# separate passes because each depends on what the previous pass removed
+# (a bullet can only become line-initial once markers before it are gone).
+_RE_MARKERS = re.compile(r"#[#\s*]*|[*`]+")                   # emphasis, ATX headings, code ticks
+_RE_LINK = re.compile(r"\[([^\]]+)\]\([^\)]+\)")              # [label](url) → label
+_RE_BULLET = re.compile(r"^\s*[-*]\s+", re.MULTILINE)         # leading bullet dashes
+_RE_NL = re.compile(r"\n+")
+
 
 def _clean_for_tts(text: str) -> str:
     """Strip markdown and symbols that sound bad when read aloud by TTS."""
-    text = re.sub(r"\*+", "", text)                               # bold / italic asterisks
-    text = re.sub(r"#+\s*", "", text)                             # ATX headings
-    text = re.sub(r"`+", "", text)                                # inline code / fences
-    text = re.sub(r"\[([^\]]+)\]\([^\)]+\)", r"\1", text)        # [label](url) → label
-    text = re.sub(r"^\s*[-*]\s+", "", text, flags=re.MULTILINE)  # leading bullet dashes
-    text = re.sub(r"\n+", " ", text).strip()
-    return text
+    text = _RE_MARKERS.sub("", text)
+    text = _RE_LINK.sub(r"\1", text)
+    text = _RE_BULLET.sub("", text)
+    return _RE_NL.sub(" ", text).strip()
 
 
 def _build_voice_messages(
@@ -85,34 +100,30 @@ def _build_voice_messages(
         lines = ["KNOWLEDGE BASE CONTEXT:\n"]
         for i, result in enumerate(rag_context, 1):
             c = result.chunk
-            lines.append(f"[{i}] {c.category} > {c.subcategory}")
-            lines.append(f"Q: {c.question}")
-            lines.append(f"A: {c.answer}")
-            lines.append("")
+            lines.extend((
+                f"[{i}] {c.category} > {c.subcategory}",
+                f"Q: {c.question}",
+                f"A: {c.answer}",
+                "",
+            ))
         context_text = "\n".join(lines)
     else:
-        context_text = (
-            "KNOWLEDGE BASE CONTEXT:\n\n"
-            "No matching context was found for this query. "
-            "Direct the caller to phone 289-454-5555 or email events.scb@aerosportsparks.ca."
-        )
+        context_text = _NO_CONTEXT_TEXT
 
     messages: list[dict] = [
         {"role": "system", "content": VOICE_SYSTEM_PROMPT},
         {"role": "system", "content": context_text},
     ]
-    # Reuse existing history — keep last 10 turns (20 messages) max
-    messages.extend(conversation_history[-20:])
+    # History arrives pre-trimmed to the last _VOICE_HISTORY_MESSAGES
+    messages.extend(conversation_history)
     messages.append({"role": "user", "content": user_message})
     return messages
 
 
 def _call_llm_sync(messages: list[dict]) -> str:
     """Blocking non-streaming LLM call with a short token budget for voice."""
-    model = os.environ.get("HF_MODEL", "meta-llama/Llama-3.1-8B-Instruct")
-    client = _make_client()
-    response = client.chat.completions.create(
-        model=model,
+    response = get_client().chat.completions.create(
+        model=_HF_MODEL,
         messages=messages,
         stream=False,
         max_tokens=150,
@@ -138,26 +149,34 @@ async def handle_voice_message(call_sid: str, user_text: str) -> str:
     """
     user_text = user_text.strip()[:500]
 
-    # RAG retrieval — same concurrent pattern as chat_handler.py
-    try:
-        semantic_results, hybrid_results = await asyncio.gather(
-            asyncio.to_thread(semantic_search, user_text, None, 5),
-            asyncio.to_thread(hybrid_search, user_text, None, 3),
-        )
-        seen: set[str] = set()
+    # RAG retrieval and history fetch run concurrently; either may fail on
+    # its own without taking the other down.
+    searches = asyncio.gather(
+        asemantic_search(user_text, None, 5),
+        ahybrid_search(user_text, None, 3),
+    )
+    search_out, history = await asyncio.gather(
+        searches,
+        asyncio.to_thread(conversation_store.get_recent, call_sid, _VOICE_HISTORY_MESSAGES),
+        return_exceptions=True,
+    )
+    if isinstance(history, BaseException):
+        logger.error("History fetch failed for voice call %s: %s", call_sid, history)
+        history = []
+
+    if isinstance(search_out, BaseException):
+        logger.error("Search failed for voice call %s: %s", call_sid, search_out)
         merged = []
-        for r in semantic_results + hybrid_results:
-            if r.chunk.id not in seen:
-                seen.add(r.chunk.id)
-                merged.append(r)
-            if len(merged) >= 5:
+    else:
+        semantic_results, hybrid_results = search_out
+        by_id: dict[str, SearchResult] = {}
+        for r in itertools.chain(semantic_results, hybrid_results):
+            by_id.setdefault(r.chunk.id, r)
+            if len(by_id) >= 5:
                 break
-    except Exception as exc:
-        logger.error("Search failed for voice call %s: %s", call_sid, exc)
-        merged = []
+        merged = list(by_id.values())
 
     # Build voice-specific prompt
-    history = conversation_store.get(call_sid)
     messages = _build_voice_messages(user_text, merged, history)
 
     # Non-streaming LLM call — run blocking I/O in a thread
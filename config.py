@@ -2,12 +2,18 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
 import os
+import tempfile
+from datetime import datetime
 from functools import lru_cache
+from pathlib import Path
 from typing import Optional
 
 import psycopg2
+import psycopg2.extensions
 from psycopg2 import pool
 from dotenv import load_dotenv
 
@@ -26,6 +32,12 @@ VOYAGE_MODEL: str = "voyage-2"
 
 LOCAL_MODEL_NAME: str = os.getenv("LOCAL_MODEL_NAME", "voyageai/voyage-4-nano")
 
+# sentence-transformers inference backend for local models: "torch" (default),
+# "onnx" or "openvino". LOCAL_MODEL_FILE optionally picks a specific exported
+# file, e.g. "onnx/model_qint8_avx512_vnni.onnx" for the int8 VNNI build.
+LOCAL_MODEL_BACKEND: str = os.getenv("LOCAL_MODEL_BACKEND", "torch")
+LOCAL_MODEL_FILE: Optional[str] = os.getenv("LOCAL_MODEL_FILE") or None
+
 # Known output dimensions per local model name.
 _LOCAL_MODEL_DIMS: dict[str, int] = {
     "voyageai/voyage-4-nano": 2048,   # Python 3.10+ required
@@ -39,7 +51,12 @@ EMBEDDING_DIM: int = (
     else _LOCAL_MODEL_DIMS.get(LOCAL_MODEL_NAME, 384)
 )
 
+# Search queries embedded per process before the least recently used is dropped.
+QUERY_EMBED_CACHE_SIZE: int = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "1024"))
+
 EMBED_BATCH_SIZE: int = 128
+# Concurrent Voyage API batches during bulk embedding (ingest / sync).
+EMBED_MAX_IN_FLIGHT: int = int(os.getenv("EMBED_MAX_IN_FLIGHT", "4"))
 
 # ---------------------------------------------------------------------------
 # Database config
@@ -51,7 +68,31 @@ DB_NAME: str = os.getenv("DB_NAME", "aerosports_rag")
 DB_USER: str = os.getenv("DB_USER", "postgres")
 DB_PASSWORD: str = os.getenv("DB_PASSWORD", "")
 
+# psycopg2 pool used by the CLI scripts and sync. minconn connections are
+# opened when the pool is created, so handshakes are paid up front.
+DB_POOL_MIN: int = int(os.getenv("DB_POOL_MIN", "2"))
+DB_POOL_MAX: int = int(os.getenv("DB_POOL_MAX", "10"))
+# Rows per multi-row INSERT / COPY call during bulk loads (ingest / sync).
+INSERT_CHUNK_SIZE: int = int(os.getenv("INSERT_CHUNK_SIZE", "500"))
+
+ASYNC_DB_POOL_MIN: int = int(os.getenv("ASYNC_DB_POOL_MIN", "4"))
+ASYNC_DB_POOL_MAX: int = int(os.getenv("ASYNC_DB_POOL_MAX", "32"))
+# asyncpg's per-connection prepared-statement cache. Set to 0 when DB_HOST
+# points at PgBouncer in transaction mode, where a statement prepared on one
+# server connection is not visible on the next.
+ASYNC_DB_STATEMENT_CACHE: int = int(os.getenv("ASYNC_DB_STATEMENT_CACHE", "100"))
+
 _db_pool: Optional[pool.ThreadedConnectionPool] = None
+_async_db_pool = None  # asyncpg.Pool, created lazily by get_async_pool()
+_async_db_pool_lock = asyncio.Lock()
+
+
+class PreparingConnection(psycopg2.extensions.connection):
+    """psycopg2 connection that remembers which statements it has PREPAREd."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.prepared: set[str] = set()
 
 
 def get_db_pool() -> pool.ThreadedConnectionPool:
@@ -59,18 +100,39 @@ def get_db_pool() -> pool.ThreadedConnectionPool:
     global _db_pool
     if _db_pool is None:
         _db_pool = pool.ThreadedConnectionPool(
-            minconn=1,
-            maxconn=10,
+            minconn=DB_POOL_MIN,
+            maxconn=DB_POOL_MAX,
             host=DB_HOST,
             port=DB_PORT,
             dbname=DB_NAME,
             user=DB_USER,
             password=DB_PASSWORD,
+            connection_factory=PreparingConnection,
         )
-        logger.info("DB pool created (host=%s db=%s)", DB_HOST, DB_NAME)
+        logger.info(
+            "DB pool created (host=%s db=%s size=%d-%d)",
+            DB_HOST, DB_NAME, DB_POOL_MIN, DB_POOL_MAX,
+        )
+        _register_vector_type(_db_pool)
     return _db_pool
 
 
+def _register_vector_type(db_pool: pool.ThreadedConnectionPool) -> None:
+    """
+    Register pgvector's psycopg2 adapters process-wide, so numpy arrays can be
+    passed straight as vector parameters and vector columns come back parsed.
+    """
+    from pgvector.psycopg2 import register_vector
+
+    conn = db_pool.getconn()
+    try:
+        register_vector(conn, globally=True)
+    except psycopg2.ProgrammingError as exc:
+        logger.warning("pgvector type not registered (%s) — has setup_db.py been run?", exc)
+    finally:
+        db_pool.putconn(conn)
+
+
 def close_db_pool() -> None:
     global _db_pool
     if _db_pool is not None:
@@ -79,6 +141,47 @@ def close_db_pool() -> None:
         logger.info("DB pool closed")
 
 
+async def _init_async_connection(conn) -> None:
+    """Per-connection setup: pgvector's binary codec, so numpy arrays bind as vectors."""
+    from pgvector.asyncpg import register_vector
+
+    await register_vector(conn)
+
+
+async def get_async_pool():
+    """Return the singleton asyncpg pool used by the chatbot's async search path."""
+    global _async_db_pool
+    if _async_db_pool is None:
+        async with _async_db_pool_lock:
+            if _async_db_pool is None:
+                import asyncpg
+
+                _async_db_pool = await asyncpg.create_pool(
+                    min_size=ASYNC_DB_POOL_MIN,
+                    max_size=ASYNC_DB_POOL_MAX,
+                    host=DB_HOST,
+                    port=DB_PORT,
+                    database=DB_NAME,
+                    user=DB_USER,
+                    password=DB_PASSWORD,
+                    statement_cache_size=ASYNC_DB_STATEMENT_CACHE,
+                    init=_init_async_connection,
+                )
+                logger.info(
+                    "Async DB pool created (host=%s db=%s size=%d-%d)",
+                    DB_HOST, DB_NAME, ASYNC_DB_POOL_MIN, ASYNC_DB_POOL_MAX,
+                )
+    return _async_db_pool
+
+
+async def close_async_pool() -> None:
+    global _async_db_pool
+    if _async_db_pool is not None:
+        await _async_db_pool.close()
+        _async_db_pool = None
+        logger.info("Async DB pool closed")
+
+
 # ---------------------------------------------------------------------------
 # Google Sheets config
 # ---------------------------------------------------------------------------
@@ -90,19 +193,76 @@ GOOGLE_CREDENTIALS_PATH: str = os.getenv(
 CHANGE_LOG_SHEET: str = os.getenv("CHANGE_LOG_SHEET", "Change Log")
 VERSION_CELL: str = os.getenv("VERSION_CELL", "M1")
 
+# OAuth access token persisted between runs, so each sync process doesn't pay
+# the JWT sign + token exchange round-trip. Tokens live about an hour.
+GCP_TOKEN_CACHE: Path = Path(
+    os.getenv("GCP_TOKEN_CACHE", "~/.cache/aerosports/gcp_token.json")
+).expanduser()
+SHEETS_HTTP_POOL_SIZE: int = 10
+
+
+def _load_cached_token(creds) -> None:
+    """Seed creds with the cached token if it was minted for this account and these scopes."""
+    try:
+        cached = json.loads(GCP_TOKEN_CACHE.read_text())
+    except (OSError, ValueError):
+        return
+    if cached.get("account") != creds.service_account_email:
+        return
+    if cached.get("scopes") != sorted(creds.scopes or ()):
+        return
+    try:
+        creds.token = cached["token"]
+        creds.expiry = datetime.fromisoformat(cached["expiry"])
+    except (KeyError, TypeError, ValueError):
+        creds.token = creds.expiry = None
+
+
+def _save_cached_token(creds) -> None:
+    payload = {
+        "account": creds.service_account_email,
+        "scopes": sorted(creds.scopes or ()),
+        "token": creds.token,
+        "expiry": creds.expiry.isoformat(),
+    }
+    try:
+        GCP_TOKEN_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        # mkstemp creates the file 0600; os.replace swaps it in atomically, so an
+        # existing cache file's old permissions never apply to the new token.
+        fd, tmp = tempfile.mkstemp(dir=GCP_TOKEN_CACHE.parent, prefix=".gcp_token.")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(payload, f)
+            os.replace(tmp, GCP_TOKEN_CACHE)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError as exc:
+        logger.warning("Could not write GCP token cache %s: %s", GCP_TOKEN_CACHE, exc)
+
 
 @lru_cache(maxsize=1)
 def get_sheets_client():
     """Return a cached gspread client authorised via service account."""
     import gspread
+    from google.auth.transport.requests import Request
     from google.oauth2.service_account import Credentials
+    from requests.adapters import HTTPAdapter
 
     scopes = [
         "https://www.googleapis.com/auth/spreadsheets",
         "https://www.googleapis.com/auth/drive.readonly",
     ]
     creds = Credentials.from_service_account_file(GOOGLE_CREDENTIALS_PATH, scopes=scopes)
+    _load_cached_token(creds)
+    if creds.valid:
+        logger.debug("Using cached GCP access token (expires %s)", creds.expiry)
+    else:
+        creds.refresh(Request())
+        _save_cached_token(creds)
+
     client = gspread.authorize(creds)
+    client.http_client.session.mount("https://", HTTPAdapter(pool_maxsize=SHEETS_HTTP_POOL_SIZE))
     logger.info("Google Sheets client initialised")
     return client
 
@@ -119,3 +279,6 @@ def get_spreadsheet():
 DEFAULT_TOP_K: int = int(os.getenv("DEFAULT_TOP_K", "5"))
 HYBRID_SEMANTIC_WEIGHT: float = 0.7
 HYBRID_KEYWORD_WEIGHT: float = 0.3
+# Hybrid search scores only the nearest HYBRID_CANDIDATES rows by embedding
+# plus the trigram (pg_trgm) text matches, instead of the whole table.
+HYBRID_CANDIDATES: int = int(os.getenv("HYBRID_CANDIDATES", "50"))
@@ -1,9 +1,13 @@
-"""Embedding utilities: embed_text() and embed_batch() supporting Voyage AI or local models."""
+"""Embedding utilities: embed_text(), embed_query() and embed_batch() supporting Voyage AI or local models."""
 
 from __future__ import annotations
 
 import logging
-from typing import Optional
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Callable, Optional
 
 import numpy as np
 
@@ -11,6 +15,11 @@ import config
 
 logger = logging.getLogger(__name__)
 
+# Every vector handed to the DB layer is EMBED_DTYPE with EMBED_DIM columns,
+# matching the vector(EMBEDDING_DIM) column created by setup_db.py.
+EMBED_DTYPE = np.float32
+EMBED_DIM: int = config.EMBEDDING_DIM
+
 # ---------------------------------------------------------------------------
 # Lazy-loaded model/client singletons
 # ---------------------------------------------------------------------------
@@ -36,15 +45,24 @@ def _get_local_model():
     if _local_model is None:
         from sentence_transformers import SentenceTransformer
 
+        kwargs = {}
+        if config.LOCAL_MODEL_BACKEND != "torch":
+            kwargs["backend"] = config.LOCAL_MODEL_BACKEND
+            if config.LOCAL_MODEL_FILE:
+                kwargs["model_kwargs"] = {"file_name": config.LOCAL_MODEL_FILE}
+
         _local_model = SentenceTransformer(
             config.LOCAL_MODEL_NAME,
             device="cpu",          # ⬅️ FORCE CPU (CRITICAL)
-            trust_remote_code=True
+            trust_remote_code=True,
+            **kwargs,
         )
 
         logger.info(
-            "Local sentence-transformer loaded: %s (CPU forced)",
+            "Local sentence-transformer loaded: %s (CPU forced, backend=%s%s)",
             config.LOCAL_MODEL_NAME,
+            config.LOCAL_MODEL_BACKEND,
+            f", file={config.LOCAL_MODEL_FILE}" if config.LOCAL_MODEL_FILE else "",
         )
 
     return _local_model
@@ -54,7 +72,24 @@ def _get_local_model():
 # ---------------------------------------------------------------------------
 
 
-def embed_text(text: str, input_type: str = "document") -> list[float]:
+def model_name() -> str:
+    """Model behind the configured provider (part of the embedding cache key)."""
+    return config.VOYAGE_MODEL if config.EMBEDDING_PROVIDER == "voyage" else config.LOCAL_MODEL_NAME
+
+
+def warm_up() -> None:
+    """
+    Embed a throwaway string so the first real query doesn't pay for loading
+    the local model or for Voyage's TCP/TLS handshake. The voyageai client
+    keeps its HTTP session alive afterwards, so later calls reuse the
+    connection.
+    """
+    t0 = time.monotonic()
+    embed_text(" ", input_type="query")
+    logger.info("Embedding provider %r warmed up in %.2fs", config.EMBEDDING_PROVIDER, time.monotonic() - t0)
+
+
+def embed_text(text: str, input_type: str = "document") -> np.ndarray:
     """
     Embed a single string.
     input_type is kept for API compatibility (ignored for local models).
@@ -62,37 +97,85 @@ def embed_text(text: str, input_type: str = "document") -> list[float]:
     return embed_batch([text])[0]
 
 
-def embed_batch(texts: list[str], batch_size: int = config.EMBED_BATCH_SIZE) -> list[list[float]]:
+@lru_cache(maxsize=config.QUERY_EMBED_CACHE_SIZE)
+def _embed_query_cached(text: str) -> np.ndarray:
+    vec = embed_text(text, input_type="query")
+    vec.flags.writeable = False  # shared between callers
+    return vec
+
+
+def embed_query(text: str) -> np.ndarray:
+    """
+    Embed a search query, memoised in-process.
+
+    Whitespace is normalised so trivially different inputs share a cache
+    entry; case is kept since it can change the embedding. The returned
+    array is read-only.
+    """
+    return _embed_query_cached(" ".join(text.split()))
+
+
+def embed_batch(
+    texts: list[str],
+    batch_size: int = config.EMBED_BATCH_SIZE,
+    on_batch: Optional[Callable[[int], None]] = None,
+) -> np.ndarray:
     """
     Embed a list of strings in batches.
 
+    Voyage batches are network-bound, so up to EMBED_MAX_IN_FLIGHT of them are
+    sent concurrently; local-model batches run one after another on the CPU.
+
     Args:
         texts: Strings to embed.
         batch_size: Max texts per API/model call.
+        on_batch: Called with the batch length as each batch finishes
+            (e.g. a progress bar's ``update``).
 
     Returns:
-        List of embedding vectors (each a list of floats).
+        float32 array of shape (len(texts), dim), rows in input order.
     """
     if not texts:
-        return []
+        return np.empty((0, EMBED_DIM), dtype=EMBED_DTYPE)
 
     provider = config.EMBEDDING_PROVIDER
-    all_embeddings: list[list[float]] = []
-
-    for start in range(0, len(texts), batch_size):
+    if provider == "voyage":
+        embed_one = _embed_voyage
+    elif provider == "local":
+        embed_one = _embed_local
+    else:
+        raise ValueError(f"Unknown EMBEDDING_PROVIDER: {provider!r}. Use 'voyage' or 'local'.")
+
+    starts = range(0, len(texts), batch_size)
+    out = np.empty((len(texts), EMBED_DIM), dtype=EMBED_DTYPE)
+
+    def _run(i: int) -> int:
+        start = starts[i]
         batch = texts[start : start + batch_size]
         logger.debug("Embedding batch %d–%d of %d", start, start + len(batch), len(texts))
-
-        if provider == "voyage":
-            embeddings = _embed_voyage(batch)
-        elif provider == "local":
-            embeddings = _embed_local(batch)
-        else:
-            raise ValueError(f"Unknown EMBEDDING_PROVIDER: {provider!r}. Use 'voyage' or 'local'.")
-
-        all_embeddings.extend(embeddings)
-
-    return all_embeddings
+        vectors = embed_one(batch)
+        if vectors.shape != (len(batch), EMBED_DIM):
+            raise ValueError(
+                f"Embedding provider {provider!r} returned shape {vectors.shape}, expected "
+                f"({len(batch)}, {EMBED_DIM}) — does EMBEDDING_DIM match the model?"
+            )
+        out[start : start + len(batch)] = vectors
+        return len(batch)
+
+    workers = config.EMBED_MAX_IN_FLIGHT if provider == "voyage" else 1
+    if workers <= 1 or len(starts) == 1:
+        for i in range(len(starts)):
+            n = _run(i)
+            if on_batch:
+                on_batch(n)
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed") as ex:
+            for fut in as_completed([ex.submit(_run, i) for i in range(len(starts))]):
+                n = fut.result()
+                if on_batch:
+                    on_batch(n)
+
+    return out
 
 
 # ---------------------------------------------------------------------------
@@ -100,13 +183,26 @@ def embed_batch(texts: list[str], batch_size: int = config.EMBED_BATCH_SIZE) ->
 # ---------------------------------------------------------------------------
 
 
-def _embed_voyage(texts: list[str]) -> list[list[float]]:
-    client = _get_voyage_client()
-    result = client.embed(texts, model=config.VOYAGE_MODEL, input_type="document")
-    return [list(vec) for vec in result.embeddings]
+def _embed_voyage(texts: list[str]) -> np.ndarray:
+    from voyageai.error import RateLimitError
 
-
-def _embed_local(texts: list[str]) -> list[list[float]]:
+    client = _get_voyage_client()
+    delay = 1.0
+    for attempt in range(4):
+        try:
+            result = client.embed(texts, model=config.VOYAGE_MODEL, input_type="document")
+            return np.asarray(result.embeddings, dtype=EMBED_DTYPE)
+        except RateLimitError:
+            if attempt == 3:
+                raise
+            # Jitter so concurrent batches that hit the limit together don't retry in lockstep.
+            wait = delay * (1 + random.random())
+            logger.warning("Voyage rate-limited, retry %d/3 in %.1fs", attempt + 1, wait)
+            time.sleep(wait)
+            delay *= 2
+
+
+def _embed_local(texts: list[str]) -> np.ndarray:
     model = _get_local_model()
     vectors: np.ndarray = model.encode(texts, show_progress_bar=False, convert_to_numpy=True)
-    return vectors.tolist()
+    return vectors.astype(EMBED_DTYPE, copy=False)
@@ -2,9 +2,12 @@
 ingest.py — Initial load of aerosports_scb_knowledge_base.json into pgvector.
 
 Steps:
-1. Load & validate 93 chunks from JSON
+1. Stream & validate chunks from JSON (ijson — never loads the whole file)
 2. Embed each chunk (question + "\n" + answer) in batches
-3. Upsert into knowledge_chunks (ON CONFLICT DO UPDATE)
+3. Binary-COPY each batch into a staging table as it is embedded (embedding
+   runs in a background thread, so DB writes overlap the next batch's
+   embedding), then merge into knowledge_chunks (ON CONFLICT DO UPDATE)
+4. Rebuild the ivfflat vector index sized to the table and swap it in
 
 Usage:
     python ingest.py
@@ -15,29 +18,48 @@ Usage:
 from __future__ import annotations
 
 import argparse
-import json
+import io
+import itertools
 import logging
+import queue
+import struct
 import sys
+import threading
 import time
 from pathlib import Path
+from typing import Iterable, Iterator
 
+import ijson
+import numpy as np
 from tqdm import tqdm
 
 import config
 import embedding as emb
+import setup_db
 from models import ChunkRecord
 
-logging.basicConfig(level=logging.INFO, format="%(levelname)s  %(message)s")
 logger = logging.getLogger(__name__)
 
 DEFAULT_JSON_PATH = Path("data/aerosports_scb_knowledge_base.json")
 
-UPSERT_SQL = """
+# seq records COPY order so the merge can keep the last row for a repeated id.
+STAGE_SQL = """
+CREATE TEMP TABLE chunk_stage (
+    seq BIGSERIAL,
+    id TEXT, category TEXT, subcategory TEXT, location TEXT,
+    question TEXT, answer TEXT, tags TEXT[], embedding vector
+) ON COMMIT DROP;
+"""
+COPY_SQL = """
+COPY chunk_stage (id, category, subcategory, location, question, answer, tags, embedding)
+FROM STDIN WITH (FORMAT BINARY)
+"""
+MERGE_SQL = """
 INSERT INTO knowledge_chunks
     (id, category, subcategory, location, question, answer, tags, embedding)
-VALUES
-    (%(id)s, %(category)s, %(subcategory)s, %(location)s,
-     %(question)s, %(answer)s, %(tags)s, %(embedding)s::vector)
+SELECT DISTINCT ON (id) id, category, subcategory, location, question, answer, tags, embedding
+FROM chunk_stage
+ORDER BY id, seq DESC
 ON CONFLICT (id) DO UPDATE SET
     category    = EXCLUDED.category,
     subcategory = EXCLUDED.subcategory,
@@ -49,32 +71,57 @@ ON CONFLICT (id) DO UPDATE SET
     updated_at  = CURRENT_TIMESTAMP;
 """
 
+# Chunks parsed, embedded and upserted together. Sized so one pipeline batch
+# keeps EMBED_MAX_IN_FLIGHT Voyage requests busy.
+PIPELINE_BATCH_SIZE = config.EMBED_BATCH_SIZE * config.EMBED_MAX_IN_FLIGHT
 
-# ---------------------------------------------------------------------------
-# Load + validate
-# ---------------------------------------------------------------------------
+# Embedded batches buffered between the embedding thread and the DB writer.
+EMBED_QUEUE_SIZE = 4
 
+REQUIRED_FIELDS = frozenset(("id", "category", "subcategory", "location", "question", "answer", "tags"))
 
-def load_chunks(json_path: Path) -> list[ChunkRecord]:
-    with open(json_path, encoding="utf-8") as f:
-        data = json.load(f)
+# Session settings for the load. The whole load is one transaction, so with
+# synchronous_commit off a crash loses at most that uncommitted load.
+LOAD_WORK_MEM = "64MB"
 
-    raw_chunks: list[dict] = data.get("chunks", [])
-    declared_total: int = data.get("metadata", {}).get("total_chunks", len(raw_chunks))
+# Session settings for the post-load vector index build.
+INDEX_MAINTENANCE_WORK_MEM = "1GB"
+INDEX_PARALLEL_WORKERS = 4
+# The rebuilt index is created under this name and renamed over the old one
+# just before commit, so searches keep using the old index during the build.
+REBUILT_INDEX_NAME = f"{setup_db.VECTOR_INDEX_NAME}_new"
 
-    logger.info("JSON declares %d chunks; found %d in file", declared_total, len(raw_chunks))
 
-    chunks: list[ChunkRecord] = []
-    errors: list[str] = []
+# ---------------------------------------------------------------------------
+# Load + validate
+# ---------------------------------------------------------------------------
 
-    for item in raw_chunks:
-        missing = [k for k in ("id", "category", "subcategory", "location", "question", "answer", "tags") if k not in item]
-        if missing:
-            errors.append(f"Chunk {item.get('id', '?')} missing fields: {missing}")
-            continue
 
-        chunks.append(
-            ChunkRecord(
+def load_chunks(json_path: Path) -> Iterator[ChunkRecord]:
+    """
+    Yield valid chunks from the JSON file one at a time.
+
+    The file is stream-parsed with ijson, so memory stays flat however many
+    chunks it holds. Invalid chunks are logged and skipped.
+    """
+    with open(json_path, "rb") as f:
+        # "metadata" precedes "chunks" in the export, so this stops early.
+        metadata = next(ijson.items(f, "metadata"), {})
+        f.seek(0)
+        declared_total = metadata.get("total_chunks")
+        if declared_total is not None:
+            logger.info("JSON declares %d chunks", declared_total)
+
+        loaded = skipped = 0
+        for item in ijson.items(f, "chunks.item"):
+            if not REQUIRED_FIELDS <= item.keys():
+                missing = sorted(REQUIRED_FIELDS - item.keys())
+                logger.error("Validation error: Chunk %s missing fields: %s", item.get("id", "?"), missing)
+                skipped += 1
+                continue
+
+            loaded += 1
+            yield ChunkRecord(
                 id=item["id"],
                 category=item["category"],
                 subcategory=item["subcategory"],
@@ -83,15 +130,16 @@ def load_chunks(json_path: Path) -> list[ChunkRecord]:
                 answer=item["answer"],
                 tags=item["tags"],
             )
-        )
 
-    if errors:
-        for e in errors:
-            logger.error("Validation error: %s", e)
-        logger.warning("%d chunks skipped due to validation errors", len(errors))
+    if skipped:
+        logger.warning("%d chunks skipped due to validation errors", skipped)
+    logger.info("Loaded %d valid chunks", loaded)
+
 
-    logger.info("Loaded %d valid chunks", len(chunks))
-    return chunks
+def _batched(chunks: Iterable[ChunkRecord], size: int) -> Iterator[list[ChunkRecord]]:
+    it = iter(chunks)
+    while batch := list(itertools.islice(it, size)):
+        yield batch
 
 
 # ---------------------------------------------------------------------------
@@ -99,23 +147,75 @@ def load_chunks(json_path: Path) -> list[ChunkRecord]:
 # ---------------------------------------------------------------------------
 
 
-def embed_chunks(chunks: list[ChunkRecord]) -> list[ChunkRecord]:
-    """Embed all chunks in batches; mutates and returns the list."""
-    texts = [c.embed_text() for c in chunks]
-    logger.info("Embedding %d chunks with provider=%r …", len(chunks), config.EMBEDDING_PROVIDER)
-
-    vectors: list[list[float]] = []
-    batch_size = config.EMBED_BATCH_SIZE
-
-    for start in tqdm(range(0, len(texts), batch_size), desc="Embedding batches", unit="batch"):
-        batch = texts[start : start + batch_size]
-        vectors.extend(emb.embed_batch(batch, batch_size=batch_size))
+def embed_chunks(chunks: Iterable[ChunkRecord]) -> Iterator[list[ChunkRecord]]:
+    """
+    Embed chunks in pipeline batches, yielding each batch once embedded.
 
-    for chunk, vec in zip(chunks, vectors):
-        chunk.embedding = vec
+    Parsing, embedding and upserting are interleaved by the caller, so peak
+    memory is one batch rather than the whole knowledge base.
+    """
+    logger.info("Embedding chunks with provider=%r …", config.EMBEDDING_PROVIDER)
 
-    logger.info("Embeddings complete (dim=%d)", len(vectors[0]) if vectors else 0)
-    return chunks
+    dim = 0
+    with tqdm(desc="Embedding", unit="chunk", mininterval=0.5) as bar:
+        for batch in _batched(chunks, PIPELINE_BATCH_SIZE):
+            vectors = emb.embed_batch(
+                [c.embed_text() for c in batch],
+                batch_size=config.EMBED_BATCH_SIZE,
+                on_batch=bar.update,
+            )
+            for chunk, vec in zip(batch, vectors):
+                chunk.embedding = vec
+            dim = vectors.shape[1]
+            yield batch
+
+    logger.info("Embeddings complete (dim=%d)", dim)
+
+
+_DONE = object()
+
+
+def _prefetch(batches: Iterator[list[ChunkRecord]], maxsize: int) -> Iterator[list[ChunkRecord]]:
+    """
+    Drive ``batches`` from a background thread through a bounded queue.
+
+    The producer (embedding) runs ahead of the consumer (DB writes) by at most
+    ``maxsize`` batches, so wall time is roughly max(embed, write) rather than
+    the sum. Producer errors are re-raised in the consumer; if the consumer
+    stops early, the producer is told to stop at its next batch boundary.
+    """
+    q: queue.Queue = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def _put(item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce() -> None:
+        try:
+            for batch in batches:
+                if not _put(batch):
+                    return
+        except BaseException as exc:  # noqa: BLE001 — handed to the consumer
+            _put(exc)
+            return
+        _put(_DONE)
+
+    producer = threading.Thread(target=_produce, name="embed-producer", daemon=True)
+    producer.start()
+    try:
+        while (item := q.get()) is not _DONE:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        producer.join()
 
 
 # ---------------------------------------------------------------------------
@@ -123,29 +223,94 @@ def embed_chunks(chunks: list[ChunkRecord]) -> list[ChunkRecord]:
 # ---------------------------------------------------------------------------
 
 
-def upsert_chunks(chunks: list[ChunkRecord]) -> None:
+# PostgreSQL binary COPY framing: signature, flags, header-extension length.
+_COPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+_COPY_TRAILER = struct.pack("!h", -1)
+_COPY_FIELDS = struct.pack("!h", 8)
+_TEXT_OID = 25
+
+
+def _copy_text(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return struct.pack("!i", len(data)) + data
+
+
+def _copy_text_array(values: list[str]) -> bytes:
+    if values:
+        body = struct.pack("!iiiii", 1, 0, _TEXT_OID, len(values), 1)
+        body += b"".join(_copy_text(v) for v in values)
+    else:
+        body = struct.pack("!iii", 0, 0, _TEXT_OID)
+    return struct.pack("!i", len(body)) + body
+
+
+def _copy_vector(vec: np.ndarray) -> bytes:
+    """pgvector binary format: dim (int16), unused (int16), big-endian float32s."""
+    data = np.asarray(vec, dtype=">f4")
+    return struct.pack("!ihh", 4 + 4 * data.size, data.size, 0) + data.tobytes()
+
+
+def _copy_buffer(chunks: list[ChunkRecord]) -> io.BytesIO:
+    """Encode chunks as one binary COPY stream for chunk_stage."""
+    buf = io.BytesIO()
+    buf.write(_COPY_HEADER)
+    for c in chunks:
+        buf.write(_COPY_FIELDS)
+        for value in (c.id, c.category, c.subcategory, c.location, c.question, c.answer):
+            buf.write(_copy_text(value))
+        buf.write(_copy_text_array(c.tags))
+        buf.write(_copy_vector(c.embedding))
+    buf.write(_COPY_TRAILER)
+    buf.seek(0)
+    return buf
+
+
+def upsert_chunks(batches: Iterable[list[ChunkRecord]]) -> int:
+    """
+    Upsert embedded batches via binary COPY into a temp staging table, in
+    COPY calls of up to INSERT_CHUNK_SIZE rows, then one INSERT … SELECT
+    merge. If the file repeats an id, the last occurrence wins. Vectors
+    travel as raw float32 rather than text, so neither side formats or
+    parses ~10 characters per dimension.
+
+    Batches are staged as they arrive, all inside one transaction, so a
+    failure part-way through (embedding or DB) leaves the table untouched.
+    After the merge the ivfflat index is rebuilt under a temporary name with
+    `lists` sized to the final row count, then swapped in for the old one.
+    Searches keep running throughout: the build only blocks writers (a
+    concurrent sync), and only the final drop + rename takes an ACCESS
+    EXCLUSIVE lock, held for the instant before commit. synchronous_commit is off for the transaction, so the
+    single commit does not wait on a WAL flush.
+
+    Returns the number of chunks upserted.
+    """
+    upserted = 0
     pool = config.get_db_pool()
     conn = pool.getconn()
     try:
         with conn:
             with conn.cursor() as cur:
-                for chunk in tqdm(chunks, desc="Upserting chunks", unit="chunk"):
-                    cur.execute(
-                        UPSERT_SQL,
-                        {
-                            "id": chunk.id,
-                            "category": chunk.category,
-                            "subcategory": chunk.subcategory,
-                            "location": chunk.location,
-                            "question": chunk.question,
-                            "answer": chunk.answer,
-                            "tags": chunk.tags,
-                            "embedding": chunk.embedding,
-                        },
-                    )
-        logger.info("Upserted %d chunks into knowledge_chunks", len(chunks))
+                cur.execute("SET LOCAL synchronous_commit = off")
+                cur.execute(f"SET LOCAL work_mem = '{LOAD_WORK_MEM}'")
+                cur.execute(STAGE_SQL)
+                for batch in batches:
+                    for page in _batched(batch, config.INSERT_CHUNK_SIZE):
+                        cur.copy_expert(COPY_SQL, _copy_buffer(page))
+                    upserted += len(batch)
+                cur.execute(MERGE_SQL)
+                cur.execute("SELECT count(*) FROM knowledge_chunks")
+                total = cur.fetchone()[0]
+                lists = setup_db.ivfflat_lists(total)
+                cur.execute(f"SET LOCAL maintenance_work_mem = '{INDEX_MAINTENANCE_WORK_MEM}'")
+                cur.execute(f"SET LOCAL max_parallel_maintenance_workers = {INDEX_PARALLEL_WORKERS}")
+                cur.execute(setup_db.VECTOR_INDEX_SQL.format(name=REBUILT_INDEX_NAME, lists=lists))
+                cur.execute(setup_db.DROP_VECTOR_INDEX_SQL)
+                cur.execute(f"ALTER INDEX {REBUILT_INDEX_NAME} RENAME TO {setup_db.VECTOR_INDEX_NAME}")
+        logger.info("Upserted %d chunks into knowledge_chunks", upserted)
+        logger.info("Rebuilt %s over %d rows (lists=%d)", setup_db.VECTOR_INDEX_NAME, total, lists)
     finally:
         pool.putconn(conn)
+    return upserted
 
 
 # ---------------------------------------------------------------------------
@@ -167,16 +332,18 @@ def main() -> None:
     chunks = load_chunks(args.path)
 
     if args.dry_run:
+        for _ in chunks:
+            pass
         logger.info("Dry run — skipping embedding and DB upsert.")
         return
 
-    chunks = embed_chunks(chunks)
-    upsert_chunks(chunks)
+    stored = upsert_chunks(_prefetch(embed_chunks(chunks), EMBED_QUEUE_SIZE))
     config.close_db_pool()
 
     elapsed = time.monotonic() - t0
-    logger.info("Ingest complete in %.1fs — %d chunks stored.", elapsed, len(chunks))
+    logger.info("Ingest complete in %.1fs — %d chunks stored.", elapsed, stored)
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s  %(message)s")
     main()
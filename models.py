@@ -3,7 +3,10 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import numpy as np
 
 
 @dataclass
@@ -15,7 +18,7 @@ class ChunkRecord:
     question: str
     answer: str
     tags: list[str]
-    embedding: Optional[list[float]] = field(default=None, repr=False)
+    embedding: Optional[np.ndarray] = field(default=None, repr=False)  # float32, shape (dim,)
 
     def embed_text(self) -> str:
         """Text used as embedding input: question + newline + answer."""
@@ -10,56 +10,90 @@ Usage (interactive test):
 from __future__ import annotations
 
 import argparse
+import asyncio
 import logging
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
+import numpy as np
+import psycopg2.errors
 import psycopg2.extras
 
 import config
 import embedding as emb
 from models import ChunkRecord, SearchResult
 
-logging.basicConfig(level=logging.INFO, format="%(levelname)s  %(message)s")
 logger = logging.getLogger(__name__)
 
+# Dedicated executor for the blocking part of the async search path (query
+# embedding), so retrieval is never queued behind unrelated to_thread work.
+_SEARCH_POOL = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("SEARCH_WORKERS", "8")),
+    thread_name_prefix="rag-search",
+)
+
 
 # ---------------------------------------------------------------------------
 # SQL
 # ---------------------------------------------------------------------------
 
+# Positional ($n) SQL shared by both drivers: asyncpg runs it directly, and the
+# psycopg2 path PREPAREs it once per connection and then EXECUTEs it.
+#   semantic: $1 query vector, $2 category filter, $3 top_k
 _SEMANTIC_SQL = """
 SELECT
     id, category, subcategory, location, question, answer, tags,
-    1 - (embedding <=> %(query_vec)s::vector) AS similarity
+    1 - (embedding <=> $1::vector) AS similarity
 FROM knowledge_chunks
-WHERE (%(category)s IS NULL OR category = %(category)s)
-ORDER BY embedding <=> %(query_vec)s::vector
-LIMIT %(top_k)s;
+WHERE ($2::text IS NULL OR category = $2)
+ORDER BY embedding <=> $1::vector
+LIMIT $3;
 """
 
 # Hybrid: weighted sum of semantic similarity (0.7) and tag keyword overlap (0.3).
-# Tag keyword match: any tag that is a sub-string of the lower-cased query gets a hit.
+# Tag keyword match: a tag that contains, or is contained in, the query gets a
+# hit. Tags are pre-lowered in the tags_lower column and the query is lowered
+# once in Python, so no lower() runs per tag per row.
+# Only candidates are scored: the $7 nearest rows by embedding (ivfflat) plus
+# rows whose search_text contains the query's words (pg_trgm GIN index, which
+# catches promo codes and exact keywords the embedding ranks low).
+#   hybrid: $1 vector, $2 lower-cased query, $3 category, $4 top_k,
+#           $5/$6 semantic/keyword weights, $7 vector candidate count
 _HYBRID_SQL = """
-WITH base AS (
+WITH candidates AS (
+    (
+        SELECT id FROM knowledge_chunks
+        WHERE ($3::text IS NULL OR category = $3)
+        ORDER BY embedding <=> $1::vector
+        LIMIT $7
+    )
+    UNION
+    (
+        SELECT id FROM knowledge_chunks
+        WHERE ($3::text IS NULL OR category = $3)
+          AND search_text %> $2::text
+    )
+),
+base AS (
     SELECT
-        id, category, subcategory, location, question, answer, tags,
-        1 - (embedding <=> %(query_vec)s::vector) AS semantic_score,
+        k.id, category, subcategory, location, question, answer, tags,
+        1 - (embedding <=> $1::vector) AS semantic_score,
         (
-            SELECT COUNT(*)::float / GREATEST(array_length(tags, 1), 1)
-            FROM unnest(tags) AS t
-            WHERE lower(%(query)s) LIKE '%%' || lower(t) || '%%'
-               OR lower(t) LIKE '%%' || lower(%(query)s) || '%%'
+            SELECT COUNT(*)::float / GREATEST(tag_count, 1)
+            FROM unnest(tags_lower) AS t
+            WHERE position(t IN $2::text) > 0 OR position($2::text IN t) > 0
         ) AS keyword_score
-    FROM knowledge_chunks
-    WHERE (%(category)s IS NULL OR category = %(category)s)
+    FROM knowledge_chunks k
+    JOIN candidates USING (id)
 )
 SELECT
     id, category, subcategory, location, question, answer, tags,
-    (%(semantic_w)s * semantic_score + %(keyword_w)s * keyword_score) AS similarity
+    ($5::float8 * semantic_score + $6::float8 * keyword_score) AS similarity
 FROM base
 ORDER BY similarity DESC
-LIMIT %(top_k)s;
+LIMIT $4;
 """
 
 
@@ -68,6 +102,11 @@ LIMIT %(top_k)s;
 # ---------------------------------------------------------------------------
 
 
+def _as_vector(vec: np.ndarray) -> np.ndarray:
+    """float32 array for the psycopg2 path; pgvector's adapter renders it as a vector."""
+    return np.asarray(vec, dtype=np.float32)
+
+
 def _row_to_chunk(row: dict) -> ChunkRecord:
     return ChunkRecord(
         id=row["id"],
@@ -76,22 +115,48 @@ def _row_to_chunk(row: dict) -> ChunkRecord:
         location=row["location"],
         question=row["question"],
         answer=row["answer"],
-        tags=list(row["tags"]),
+        tags=row["tags"],  # text[] already arrives as a list from both drivers
     )
 
 
-def _fetch(sql: str, params: dict) -> list[SearchResult]:
+def _execute_prepared(cur, name: str, sql: str, args: tuple) -> None:
+    """EXECUTE *name*, PREPAREing *sql* on this connection first if needed."""
+    conn = cur.connection
+    if name not in conn.prepared:
+        cur.execute(f"PREPARE {name} AS {sql}")
+        conn.prepared.add(name)
+    cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(args))})", args)
+
+
+def _fetch(name: str, sql: str, *args) -> list[SearchResult]:
     pool = config.get_db_pool()
     conn = pool.getconn()
     try:
         with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute(sql, params)
+            try:
+                _execute_prepared(cur, name, sql, args)
+            except psycopg2.errors.InvalidSqlStatementName:
+                # Statement vanished server-side (e.g. connection reset): re-prepare once.
+                conn.rollback()
+                conn.prepared.discard(name)
+                _execute_prepared(cur, name, sql, args)
             rows = cur.fetchall()
         return [SearchResult(chunk=_row_to_chunk(r), similarity_score=float(r["similarity"])) for r in rows]
     finally:
         pool.putconn(conn)
 
 
+async def _embed_query_async(query: str) -> np.ndarray:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_SEARCH_POOL, emb.embed_query, query)
+
+
+async def _fetch_async(sql: str, *args) -> list[SearchResult]:
+    pool = await config.get_async_pool()
+    rows = await pool.fetch(sql, *args)
+    return [SearchResult(chunk=_row_to_chunk(r), similarity_score=float(r["similarity"])) for r in rows]
+
+
 # ---------------------------------------------------------------------------
 # Public API
 # ---------------------------------------------------------------------------
@@ -113,15 +178,8 @@ def semantic_search(
     Returns:
         List of SearchResult ordered by descending similarity.
     """
-    query_vec = emb.embed_text(query, input_type="query")
-    return _fetch(
-        _SEMANTIC_SQL,
-        {
-            "query_vec": query_vec,
-            "category": category,
-            "top_k": top_k,
-        },
-    )
+    query_vec = emb.embed_query(query)
+    return _fetch("rag_semantic", _SEMANTIC_SQL, _as_vector(query_vec), category, top_k)
 
 
 def hybrid_search(
@@ -142,17 +200,46 @@ def hybrid_search(
     Returns:
         List of SearchResult ordered by descending combined score.
     """
-    query_vec = emb.embed_text(query, input_type="query")
+    query_vec = emb.embed_query(query)
     return _fetch(
+        "rag_hybrid",
+        _HYBRID_SQL,
+        _as_vector(query_vec),
+        query.lower(),
+        category,
+        top_k,
+        config.HYBRID_SEMANTIC_WEIGHT,
+        config.HYBRID_KEYWORD_WEIGHT,
+        config.HYBRID_CANDIDATES,
+    )
+
+
+async def asemantic_search(
+    query: str,
+    category: Optional[str] = None,
+    top_k: int = config.DEFAULT_TOP_K,
+) -> list[SearchResult]:
+    """Async semantic_search() over the shared asyncpg pool."""
+    query_vec = await _embed_query_async(query)
+    return await _fetch_async(_SEMANTIC_SQL, query_vec, category, top_k)
+
+
+async def ahybrid_search(
+    query: str,
+    category: Optional[str] = None,
+    top_k: int = config.DEFAULT_TOP_K,
+) -> list[SearchResult]:
+    """Async hybrid_search() over the shared asyncpg pool."""
+    query_vec = await _embed_query_async(query)
+    return await _fetch_async(
         _HYBRID_SQL,
-        {
-            "query_vec": query_vec,
-            "query": query,
-            "category": category,
-            "top_k": top_k,
-            "semantic_w": config.HYBRID_SEMANTIC_WEIGHT,
-            "keyword_w": config.HYBRID_KEYWORD_WEIGHT,
-        },
+        query_vec,
+        query.lower(),
+        category,
+        top_k,
+        config.HYBRID_SEMANTIC_WEIGHT,
+        config.HYBRID_KEYWORD_WEIGHT,
+        config.HYBRID_CANDIDATES,
     )
 
 
@@ -201,4 +288,5 @@ def main() -> None:
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s  %(message)s")
     main()
@@ -2,7 +2,8 @@
 setup_db.py — One-time database initialisation.
 
 Creates the aerosports_rag database (if it doesn't exist), installs the
-pgvector extension, and creates all tables and indexes.
+pgvector extension, and creates all tables and indexes (except the vector
+index, which ingest.py builds after loading data).
 
 Usage:
     python setup_db.py
@@ -11,6 +12,7 @@ Usage:
 from __future__ import annotations
 
 import logging
+import math
 import sys
 
 import psycopg2
@@ -18,7 +20,6 @@ from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 
 import config
 
-logging.basicConfig(level=logging.INFO, format="%(levelname)s  %(message)s")
 logger = logging.getLogger(__name__)
 
 
@@ -27,8 +28,9 @@ logger = logging.getLogger(__name__)
 # ---------------------------------------------------------------------------
 
 DDL = f"""
--- Extension
+-- Extensions
 CREATE EXTENSION IF NOT EXISTS vector;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
 
 -- Main knowledge store
 CREATE TABLE IF NOT EXISTS knowledge_chunks (
@@ -44,6 +46,27 @@ CREATE TABLE IF NOT EXISTS knowledge_chunks (
     updated_at   TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Lower-cased tags, precomputed once per write for hybrid keyword scoring.
+-- Generated columns need an IMMUTABLE expression, hence the helper function.
+CREATE OR REPLACE FUNCTION lower_tags(text[]) RETURNS text[]
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    AS $$ SELECT array(SELECT lower(t) FROM unnest($1) AS t) $$;
+
+ALTER TABLE knowledge_chunks
+    ADD COLUMN IF NOT EXISTS tags_lower TEXT[] GENERATED ALWAYS AS (lower_tags(tags)) STORED;
+ALTER TABLE knowledge_chunks
+    ADD COLUMN IF NOT EXISTS tag_count INT GENERATED ALWAYS AS (cardinality(tags)) STORED;
+
+-- Question + answer + tags as one string for trigram prefiltering in hybrid
+-- search (array_to_string is not IMMUTABLE, so it is wrapped like lower_tags).
+CREATE OR REPLACE FUNCTION chunk_search_text(text, text, text[]) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE
+    AS $$ SELECT $1 || ' ' || $2 || ' ' || array_to_string($3, ' ') $$;
+
+ALTER TABLE knowledge_chunks
+    ADD COLUMN IF NOT EXISTS search_text TEXT
+    GENERATED ALWAYS AS (chunk_search_text(question, answer, tags)) STORED;
+
 -- Sync state: tracks the latest sheet version we've processed
 CREATE TABLE IF NOT EXISTS sync_state (
     id              INTEGER PRIMARY KEY DEFAULT 1,
@@ -61,12 +84,26 @@ CREATE TABLE IF NOT EXISTS sync_history (
     synced_at    TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Embeddings keyed by sha256 of the embedded text, so sync never pays to
+-- re-embed text it has embedded before with the same provider + model
+CREATE TABLE IF NOT EXISTS embedding_cache (
+    hash         TEXT NOT NULL,
+    provider     TEXT NOT NULL,
+    model        TEXT NOT NULL,
+    embedding    vector({config.EMBEDDING_DIM}) NOT NULL,
+    created_at   TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (hash, provider, model)
+);
+
 -- Indexes
 CREATE INDEX IF NOT EXISTS idx_chunks_category    ON knowledge_chunks (category);
 CREATE INDEX IF NOT EXISTS idx_chunks_subcategory ON knowledge_chunks (subcategory);
 CREATE INDEX IF NOT EXISTS idx_chunks_tags        ON knowledge_chunks USING GIN (tags);
-CREATE INDEX IF NOT EXISTS idx_chunks_embedding   ON knowledge_chunks
-    USING ivfflat (embedding vector_cosine_ops) WITH (lists = 10);
+CREATE INDEX IF NOT EXISTS idx_chunks_trgm        ON knowledge_chunks
+    USING GIN (search_text gin_trgm_ops);
+-- The ivfflat vector index is built by ingest.py once the table has data
+-- (see VECTOR_INDEX_SQL): its centroids are trained on the rows present at
+-- build time, and bulk loads are much faster without it.
 
 -- Seed sync_state with a single row if missing
 INSERT INTO sync_state (id, last_version)
@@ -75,6 +112,23 @@ ON CONFLICT (id) DO NOTHING;
 """
 
 
+VECTOR_INDEX_NAME = "idx_chunks_embedding"
+
+DROP_VECTOR_INDEX_SQL = f"DROP INDEX IF EXISTS {VECTOR_INDEX_NAME};"
+
+VECTOR_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS {name} ON knowledge_chunks
+    USING ivfflat (embedding vector_cosine_ops) WITH (lists = {lists});
+"""
+
+
+def ivfflat_lists(n_rows: int) -> int:
+    """pgvector's guidance: rows/1000 up to 1M rows, sqrt(rows) beyond; at least 10."""
+    if n_rows > 1_000_000:
+        return int(math.sqrt(n_rows))
+    return max(10, n_rows // 1000)
+
+
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
@@ -139,5 +193,6 @@ def setup() -> None:
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s  %(message)s")
     setup()
     logger.info("Done. Run `python ingest.py` to load the knowledge base.")
@@ -2,18 +2,20 @@
 sync.py — Google Sheets Change Log → pgvector sync.
 
 Flow:
-1. Read version cell (M1) from Change Log sheet
+1. Read version cell (M1), the Change Log and the FAQs sheet in one batchGet
 2. Compare to sync_state.last_version in DB → skip if unchanged
-3. Read Change Log rows where synced = FALSE
+3. Pick Change Log rows where synced = FALSE
 4. Group rows by chunk_id (avoid re-embedding same chunk multiple times)
 5. For each chunk group:
    - DELETE: remove from DB
-   - UPDATE/ADD on FAQs: re-fetch full Q+A from FAQs sheet, re-embed, upsert
-   - UPDATE/ADD on data sheets: re-fetch ALL rows for that chunk_id from
-     source sheet, rebuild structured text, re-embed, upsert
-6. Mark all processed rows synced=TRUE, synced_at=now in the sheet
-7. Update sync_state.last_version + last_synced_at in DB
-8. Append to sync_history
+   - UPDATE/ADD on FAQs: look up full Q+A in the FAQs rows read in step 1
+   - UPDATE/ADD on data sheets: gather ALL rows for that chunk_id from its
+     source sheet (every touched sheet read in one batchGet), rebuild
+     structured text
+   then embed all rebuilt chunks in one batched call
+6. In one DB transaction: apply deletes + upserts, append to sync_history,
+   update sync_state.last_version + last_synced_at
+7. Mark all processed rows synced=TRUE, synced_at=now in the sheet (one batch_update)
 
 Usage:
     python sync.py              # normal run
@@ -24,19 +26,21 @@ Usage:
 from __future__ import annotations
 
 import argparse
+import atexit
+import hashlib
+import io
 import logging
-import sys
 from collections import defaultdict
 from datetime import datetime, timezone
 from typing import Optional
 
-import psycopg2
+import numpy as np
+from psycopg2.extras import execute_values
 
 import config
 import embedding as emb
 from models import ChangeLogEntry, ChunkRecord
 
-logging.basicConfig(level=logging.INFO, format="%(levelname)s  %(message)s")
 logger = logging.getLogger(__name__)
 
 # Column indices in the Change Log sheet (0-based)
@@ -50,8 +54,15 @@ COL_OLD_VALUE  = 6   # G
 COL_NEW_VALUE  = 7   # H
 COL_SYNCED     = 8   # I
 COL_SYNCED_AT  = 9   # J
+ROW_WIDTH      = COL_SYNCED_AT + 1
 
-HEADER_ROW = 0
+# Change Log data starts below the header row (1-based sheet row number).
+FIRST_DATA_ROW = 2
+
+# Values of the "synced" column that mean the row was already processed.
+SYNCED_FLAGS = frozenset({"TRUE", "YES", "1", "DONE"})
+
+FAQS_SHEET = "FAQs"
 
 # Maps chunk_id prefix → category for non-FAQ chunks
 CATEGORY_MAP = {
@@ -96,72 +107,179 @@ QUESTION_MAP = {
 # ---------------------------------------------------------------------------
 
 
-def _get_last_version(conn) -> str:
-    with conn.cursor() as cur:
-        cur.execute("SELECT last_version FROM sync_state WHERE id = 1")
-        row = cur.fetchone()
-        return row[0] if row else "1.0"
+def _get_last_version(cur) -> str:
+    cur.execute("SELECT last_version FROM sync_state WHERE id = 1")
+    row = cur.fetchone()
+    return row[0] if row else "1.0"
 
 
-def _update_sync_state(conn, version: str) -> None:
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            UPDATE sync_state
-            SET last_version = %s, last_synced_at = CURRENT_TIMESTAMP
-            WHERE id = 1
-            """,
-            (version,),
-        )
+def _update_sync_state(cur, version: str) -> None:
+    cur.execute(
+        """
+        UPDATE sync_state
+        SET last_version = %s, last_synced_at = CURRENT_TIMESTAMP
+        WHERE id = 1
+        """,
+        (version,),
+    )
 
 
-def _log_sync_history(conn, entry: ChangeLogEntry) -> None:
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO sync_history (change_id, chunk_id, change_type, field_changed)
-            VALUES (%s, %s, %s, %s)
-            """,
-            (entry.change_id, entry.chunk_id, entry.change_type, entry.field_changed),
-        )
+# Above this many history rows, COPY beats multi-row INSERTs.
+HISTORY_COPY_THRESHOLD = 1000
 
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_history(cur, entries: list[ChangeLogEntry]) -> None:
+    """COPY … FROM STDIN (text format) for large history appends."""
+    buf = io.StringIO()
+    for e in entries:
+        fields = (e.change_id, e.chunk_id, e.change_type, e.field_changed)
+        buf.write("\t".join(f.translate(_COPY_ESCAPES) for f in fields))
+        buf.write("\n")
+    buf.seek(0)
+    cur.copy_expert(
+        "COPY sync_history (change_id, chunk_id, change_type, field_changed) FROM STDIN WITH (FORMAT text)",
+        buf,
+    )
+
+
+def _log_sync_history(cur, entries: list[ChangeLogEntry]) -> None:
+    """Append one sync_history row per entry in a single multi-row INSERT (or COPY)."""
+    if not entries:
+        return
+    if len(entries) > HISTORY_COPY_THRESHOLD:
+        _copy_history(cur, entries)
+        return
+    execute_values(
+        cur,
+        "INSERT INTO sync_history (change_id, chunk_id, change_type, field_changed) VALUES %s",
+        [(e.change_id, e.chunk_id, e.change_type, e.field_changed) for e in entries],
+        page_size=config.INSERT_CHUNK_SIZE,
+    )
+
+
+_UPSERT_COLUMNS = "(id, category, subcategory, location, question, answer, tags, embedding)"
+_UPSERT_ON_CONFLICT = """
+ON CONFLICT (id) DO UPDATE SET
+    category    = EXCLUDED.category,
+    subcategory = EXCLUDED.subcategory,
+    location    = EXCLUDED.location,
+    question    = EXCLUDED.question,
+    answer      = EXCLUDED.answer,
+    tags        = EXCLUDED.tags,
+    embedding   = EXCLUDED.embedding,
+    updated_at  = CURRENT_TIMESTAMP
+"""
+UPSERT_SQL = f"INSERT INTO knowledge_chunks {_UPSERT_COLUMNS} VALUES %s" + _UPSERT_ON_CONFLICT
+UPSERT_TEMPLATE = "(%s, %s, %s, %s, %s, %s, %s, %s::vector)"
+
+# At or above this many rebuilt chunks (or on --force), stage them with COPY
+# and merge in one INSERT … SELECT instead of multi-row INSERTs.
+CHUNK_COPY_THRESHOLD = 64
+
+STAGE_SQL = """
+CREATE TEMP TABLE chunk_stage (LIKE knowledge_chunks INCLUDING DEFAULTS) ON COMMIT DROP
+"""
+MERGE_SQL = (
+    f"INSERT INTO knowledge_chunks {_UPSERT_COLUMNS} "
+    f"SELECT {_UPSERT_COLUMNS[1:-1]} FROM chunk_stage" + _UPSERT_ON_CONFLICT
+)
+
+
+def _copy_array(values: list[str]) -> str:
+    """text[] literal, e.g. {"a","b \\"c\\""}; COPY escaping is applied on top."""
+    return "{" + ",".join('"' + v.replace("\\", "\\\\").replace('"', '\\"') + '"' for v in values) + "}"
+
+
+def _copy_chunks(cur, chunks: list[ChunkRecord]) -> None:
+    """Stage chunks with COPY … FROM STDIN (text format), then merge them into knowledge_chunks."""
+    buf = io.StringIO()
+    for c in chunks:
+        fields = (c.id, c.category, c.subcategory, c.location, c.question, c.answer, _copy_array(c.tags))
+        buf.write("\t".join(f.translate(_COPY_ESCAPES) for f in fields))
+        buf.write("\t[")
+        buf.write(",".join(map(repr, c.embedding.tolist())))
+        buf.write("]\n")
+    buf.seek(0)
+    cur.execute(STAGE_SQL)
+    cur.copy_expert(f"COPY chunk_stage {_UPSERT_COLUMNS} FROM STDIN WITH (FORMAT text)", buf)
+    cur.execute(MERGE_SQL)
+
+
+def _upsert_chunks(cur, chunks: list[ChunkRecord], bulk: bool = False) -> None:
+    """
+    Upsert all chunks with multi-row INSERTs of up to INSERT_CHUNK_SIZE rows,
+    or through a COPY-loaded staging table for large rebuilds / bulk=True.
+    """
+    if not chunks:
+        return
+    if bulk or len(chunks) >= CHUNK_COPY_THRESHOLD:
+        _copy_chunks(cur, chunks)
+        return
+    rows = [
+        (c.id, c.category, c.subcategory, c.location, c.question, c.answer, c.tags, c.embedding)
+        for c in chunks
+    ]
+    execute_values(cur, UPSERT_SQL, rows, template=UPSERT_TEMPLATE, page_size=config.INSERT_CHUNK_SIZE)
+
+
+def _delete_chunks(cur, chunk_ids: list[str]) -> None:
+    if not chunk_ids:
+        return
+    cur.execute("DELETE FROM knowledge_chunks WHERE id = ANY(%s)", (chunk_ids,))
+    logger.info("Deleted %d chunks (%d rows affected)", len(chunk_ids), cur.rowcount)
+
+
+_CONTENT_FIELDS = ("category", "subcategory", "location", "question", "answer", "tags")
 
-def _upsert_chunk(conn, chunk: ChunkRecord) -> None:
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            INSERT INTO knowledge_chunks
-                (id, category, subcategory, location, question, answer, tags, embedding)
-            VALUES
-                (%(id)s, %(category)s, %(subcategory)s, %(location)s,
-                 %(question)s, %(answer)s, %(tags)s, %(embedding)s::vector)
-            ON CONFLICT (id) DO UPDATE SET
-                category    = EXCLUDED.category,
-                subcategory = EXCLUDED.subcategory,
-                location    = EXCLUDED.location,
-                question    = EXCLUDED.question,
-                answer      = EXCLUDED.answer,
-                tags        = EXCLUDED.tags,
-                embedding   = EXCLUDED.embedding,
-                updated_at  = CURRENT_TIMESTAMP
-            """,
-            {
-                "id":          chunk.id,
-                "category":    chunk.category,
-                "subcategory": chunk.subcategory,
-                "location":    chunk.location,
-                "question":    chunk.question,
-                "answer":      chunk.answer,
-                "tags":        chunk.tags,
-                "embedding":   chunk.embedding,
-            },
-        )
+
+def _get_existing_chunks(cur, chunk_ids: list[str]) -> dict[str, tuple]:
+    """chunk_id → stored (category, subcategory, location, question, answer, tags), one query."""
+    cur.execute(
+        f"SELECT id, {', '.join(_CONTENT_FIELDS)} FROM knowledge_chunks WHERE id = ANY(%s)",
+        (chunk_ids,),
+    )
+    return {row[0]: tuple(row[1:]) for row in cur.fetchall()}
+
+
+def _content(chunk: ChunkRecord) -> tuple:
+    return tuple(getattr(chunk, f) for f in _CONTENT_FIELDS)
 
 
-def _delete_chunk(conn, chunk_id: str) -> None:
-    with conn.cursor() as cur:
-        cur.execute("DELETE FROM knowledge_chunks WHERE id = %s", (chunk_id,))
-        logger.info("Deleted chunk %r (%d row affected)", chunk_id, cur.rowcount)
+def _content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _get_cached_embeddings(cur, hashes: list[str]) -> dict:
+    """
+    hash → float32 ndarray for every hash already in embedding_cache for this
+    provider + model. The column is read as real[], which psycopg2 returns as
+    a list of floats whatever the pgvector version (Vector, ndarray) or even
+    when the vector type wasn't registered, then converted to match what
+    embed_batch returns.
+    """
+    cur.execute(
+        """
+        SELECT hash, embedding::real[] FROM embedding_cache
+        WHERE provider = %s AND model = %s AND hash = ANY(%s)
+        """,
+        (config.EMBEDDING_PROVIDER, emb.model_name(), hashes),
+    )
+    return {h: np.asarray(vec, dtype=emb.EMBED_DTYPE) for h, vec in cur.fetchall()}
+
+
+def _store_cached_embeddings(cur, items: list[tuple[str, object]]) -> None:
+    provider, model = config.EMBEDDING_PROVIDER, emb.model_name()
+    execute_values(
+        cur,
+        """
+        INSERT INTO embedding_cache (hash, provider, model, embedding)
+        VALUES %s ON CONFLICT DO NOTHING
+        """,
+        [(h, provider, model, vec) for h, vec in items],
+        template="(%s, %s, %s, %s::vector)",
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -169,29 +287,57 @@ def _delete_chunk(conn, chunk_id: str) -> None:
 # ---------------------------------------------------------------------------
 
 
-def _read_version(spreadsheet) -> str:
-    sheet = spreadsheet.worksheet(config.CHANGE_LOG_SHEET)
-    return sheet.acell(config.VERSION_CELL).value or "1.0"
+def _a1(sheet_name: str, cells: Optional[str] = None) -> str:
+    """A1 range with the sheet name quoted, e.g. 'Change Log'!A:J (whole sheet if no cells)."""
+    quoted = "'{}'".format(sheet_name.replace("'", "''"))
+    return f"{quoted}!{cells}" if cells else quoted
+
+
+def _read_sheets(spreadsheet) -> tuple[str, list[list[str]], dict[str, tuple[str, str, str]]]:
+    """
+    Fetch everything sync needs from the Change Log and FAQs sheets in a
+    single values.batchGet round trip.
 
+    Only columns A:J below the Change Log header are fetched; the API stops
+    at the last populated row.
 
-def _read_unsynced_rows(spreadsheet) -> tuple[list[ChangeLogEntry], list[int]]:
+    Returns (version, change_log_rows, faqs) where faqs maps chunk_id →
+    (category, question, answer) from the FAQs sheet, stripped.
+    """
+    result = spreadsheet.values_batch_get([
+        _a1(config.CHANGE_LOG_SHEET, config.VERSION_CELL),
+        _a1(config.CHANGE_LOG_SHEET, f"A{FIRST_DATA_ROW}:J"),
+        _a1(FAQS_SHEET, "A:D"),
+    ])
+    version_range, log_range, faqs_range = result["valueRanges"]
+
+    version_values = version_range.get("values") or [[""]]
+    version = str(version_values[0][0]).strip() or "1.0"
+
+    faqs: dict[str, tuple[str, str, str]] = {}
+    for row in faqs_range.get("values", [])[1:]:
+        chunk_id = row[0].strip() if row else ""
+        if chunk_id and chunk_id not in faqs:
+            category, question, answer = (row[1:4] + ["", "", ""])[:3]
+            faqs[chunk_id] = (category.strip(), question.strip(), answer.strip())
+
+    return version, log_range.get("values", []), faqs
+
+
+def _read_unsynced_rows(all_rows: list[list[str]]) -> tuple[list[ChangeLogEntry], list[int]]:
     """
     Returns (entries, sheet_row_indices) where sheet_row_indices are 1-based
     row numbers in the Google Sheet (for marking synced later).
     """
-    sheet = spreadsheet.worksheet(config.CHANGE_LOG_SHEET)
-    all_rows = sheet.get_all_values()
-
     entries: list[ChangeLogEntry] = []
     row_indices: list[int] = []
 
-    for i, row in enumerate(all_rows):
-        if i == HEADER_ROW:
-            continue
-        row = row + [""] * (COL_SYNCED_AT + 1 - len(row))
+    for sheet_row, row in enumerate(all_rows, start=FIRST_DATA_ROW):
+        # The API trims trailing empty cells; pad short rows in place.
+        if len(row) < ROW_WIDTH:
+            row.extend([""] * (ROW_WIDTH - len(row)))
 
-        synced_flag = row[COL_SYNCED].strip().upper()
-        if synced_flag in ("TRUE", "YES", "1", "DONE"):
+        if row[COL_SYNCED].strip().upper() in SYNCED_FLAGS:
             continue
 
         chunk_id = row[COL_CHUNK_ID].strip()
@@ -211,38 +357,26 @@ def _read_unsynced_rows(spreadsheet) -> tuple[list[ChangeLogEntry], list[int]]:
                 new_value=row[COL_NEW_VALUE].strip(),
             )
         )
-        row_indices.append(i + 1)
+        row_indices.append(sheet_row)
 
     return entries, row_indices
 
 
-def _mark_synced(spreadsheet, row_index: int) -> None:
-    """Set synced=TRUE and synced_at=now for a sheet row."""
-    sheet = spreadsheet.worksheet(config.CHANGE_LOG_SHEET)
-    now_str = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
-    sheet.update_cell(row_index, COL_SYNCED + 1, "TRUE")
-    sheet.update_cell(row_index, COL_SYNCED_AT + 1, now_str)
+def _get_worksheets(spreadsheet) -> dict:
+    """Title → worksheet handle for every tab, from one metadata request."""
+    return {ws.title: ws for ws in spreadsheet.worksheets()}
 
 
-def _mark_synced_batch(spreadsheet, row_indices: list[int]) -> None:
-    """Batch-mark multiple rows as synced (fewer API calls)."""
-    sheet = spreadsheet.worksheet(config.CHANGE_LOG_SHEET)
+def _mark_synced_batch(worksheets: dict, row_indices: list[int]) -> None:
+    """Mark rows synced=TRUE, synced_at=now in one batch_update request."""
+    if not row_indices:
+        return
+    sheet = worksheets[config.CHANGE_LOG_SHEET]
     now_str = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
-
-    # Build batch updates: [(row, col, value), ...]
-    cells_to_update = []
-    for row_index in row_indices:
-        cells_to_update.append({
-            "range": f"I{row_index}",
-            "values": [["TRUE"]],
-        })
-        cells_to_update.append({
-            "range": f"J{row_index}",
-            "values": [[now_str]],
-        })
-
-    if cells_to_update:
-        sheet.batch_update(cells_to_update)
+    sheet.batch_update(
+        [{"range": f"I{r}:J{r}", "values": [["TRUE", now_str]]} for r in row_indices],
+        value_input_option="USER_ENTERED",
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -256,79 +390,59 @@ def _get_chunk_prefix(chunk_id: str) -> str:
     return parts[1] if len(parts) >= 2 else "general"
 
 
-def _fetch_chunk_from_faqs_sheet(spreadsheet, chunk_id: str) -> Optional[ChunkRecord]:
+def _fetch_chunk_from_faqs_sheet(
+    faqs: dict[str, tuple[str, str, str]], chunk_id: str
+) -> Optional[ChunkRecord]:
     """
-    Read the FAQs sheet and rebuild a ChunkRecord for the given chunk_id.
+    Rebuild a ChunkRecord for the given chunk_id from the prefetched FAQs index.
     FAQs columns: chunk_id | category | question | answer
     """
-    try:
-        sheet = spreadsheet.worksheet("FAQs")
-    except Exception:
-        logger.error("FAQs sheet not found")
+    faq = faqs.get(chunk_id)
+    if faq is None:
+        logger.warning("FAQ %r not found in FAQs sheet", chunk_id)
         return None
 
-    rows = sheet.get_all_values()
-    for row in rows[1:]:
-        if not row:
-            continue
-        row = row + [""] * 4
-        if row[0].strip() == chunk_id:
-            category = row[1].strip() or "FAQ"
-            question = row[2].strip()
-            answer = row[3].strip()
-
-            if not question and not answer:
-                logger.warning("FAQ %r has no question or answer", chunk_id)
-                return None
-
-            return ChunkRecord(
-                id=chunk_id,
-                category=category,
-                subcategory=category,
-                location="Scarborough",
-                question=question,
-                answer=answer,
-                tags=["faq", category.lower().replace(" ", "_")],
-            )
-    logger.warning("FAQ %r not found in FAQs sheet", chunk_id)
-    return None
+    category, question, answer = faq
+    category = category or "FAQ"
 
+    if not question and not answer:
+        logger.warning("FAQ %r has no question or answer", chunk_id)
+        return None
 
-def _fetch_chunk_from_data_sheet(
-    spreadsheet, sheet_name: str, chunk_id: str
-) -> Optional[ChunkRecord]:
+    return ChunkRecord(
+        id=chunk_id,
+        category=category,
+        subcategory=category,
+        location="Scarborough",
+        question=question,
+        answer=answer,
+        tags=["faq", category.lower().replace(" ", "_")],
+    )
+
+
+SheetIndex = dict[str, list[dict[str, str]]]
+
+
+def _index_data_sheet(all_rows: list[list[str]]) -> SheetIndex:
     """
-    Re-reads the source sheet, finds ALL rows for the given chunk_id,
-    and rebuilds the chunk as structured text.
+    chunk_id → its rows as header → value dicts, built in one pass over the sheet.
 
     Handles sub-tables (Birthday Parties, Group Bookings, Aero Camp)
     by detecting rows where col A = "chunk_id" as sub-table headers.
     """
-    try:
-        sheet = spreadsheet.worksheet(sheet_name)
-    except Exception:
-        logger.error("Sheet %r not found", sheet_name)
-        return None
-
-    all_rows = sheet.get_all_values()
+    index: SheetIndex = defaultdict(list)
     if not all_rows:
-        return None
+        return index
 
-    # ── Collect all rows belonging to this chunk_id ──
     current_headers = all_rows[0]
-    chunk_rows: list[dict[str, str]] = []
-
-    for i, row in enumerate(all_rows):
-        if i == 0:
-            continue
-
+    for row in all_rows[1:]:
         # Detect sub-table header rows
         if row and row[0].strip().lower() == "chunk_id":
             current_headers = row
             continue
 
         row_chunk_id = row[0].strip() if row else ""
-        if not row_chunk_id or row_chunk_id != chunk_id:
+        if not row_chunk_id:
             continue
 
         # Build header → value dict for this row
@@ -341,8 +455,37 @@ def _fetch_chunk_from_data_sheet(
             if val:
                 row_dict[header_clean] = val
         if row_dict:
-            chunk_rows.append(row_dict)
+            index[row_chunk_id].append(row_dict)
+    return index
+
+
+def _read_data_sheets(spreadsheet, worksheets: dict, sheet_names: set[str]) -> dict[str, SheetIndex]:
+    """
+    Fetch every source sheet the pending changes touch in one values.batchGet
+    and index each by chunk_id. Names that aren't tabs in the spreadsheet are
+    left out (a missing range would fail the whole request); their chunks are
+    reported when rebuilt.
+    """
+    names = sorted(n for n in sheet_names if n in worksheets)
+    if not names:
+        return {}
+    result = spreadsheet.values_batch_get([_a1(n) for n in names])
+    return {n: _index_data_sheet(vr.get("values", [])) for n, vr in zip(names, result["valueRanges"])}
+
+
+def _fetch_chunk_from_data_sheet(
+    data_sheets: dict[str, SheetIndex], sheet_name: str, chunk_id: str
+) -> Optional[ChunkRecord]:
+    """
+    Looks up ALL rows for the given chunk_id in the indexed source sheet,
+    and rebuilds the chunk as structured text.
+    """
+    index = data_sheets.get(sheet_name)
+    if index is None:
+        logger.error("Sheet %r not found", sheet_name)
+        return None
 
+    chunk_rows = index.get(chunk_id)
     if not chunk_rows:
         logger.warning("No rows found for %r in %r", chunk_id, sheet_name)
         return None
@@ -375,67 +518,87 @@ def _fetch_chunk_from_data_sheet(
 # ---------------------------------------------------------------------------
 
 
-def _resolve_chunk_group(
-    conn, spreadsheet, chunk_id: str, entries: list[ChangeLogEntry], dry_run: bool
-) -> bool:
-    """
-    Process a group of change log entries that all share the same chunk_id.
+def _source_sheet(chunk_id: str, entries: list[ChangeLogEntry]) -> str:
+    # All entries for the same chunk_id should come from the same sheet,
+    # but take the most recent one to be safe
+    sheet_name = entries[-1].sheet_name
+    return FAQS_SHEET if chunk_id.startswith("scb_faq_") else sheet_name
 
-    Instead of patching field-by-field, we:
-    1. Determine the final action (DELETE wins, otherwise rebuild)
-    2. Re-fetch the entire chunk from the source sheet
-    3. Re-embed once
-    4. Upsert once
 
-    This means if 5 fields changed on the same chunk, we do 1 fetch + 1 embed
-    instead of 5.
+def _build_chunk(
+    data_sheets: dict[str, SheetIndex],
+    faqs: dict[str, tuple[str, str, str]],
+    chunk_id: str,
+    entries: list[ChangeLogEntry],
+) -> Optional[ChunkRecord]:
     """
+    Rebuild the full chunk for a group of non-DELETE entries sharing chunk_id.
 
-    # Check if any entry in the group is a DELETE
-    has_delete = any(e.change_type == "DELETE" for e in entries)
-
-    if has_delete:
-        if not dry_run:
-            with conn:
-                _delete_chunk(conn, chunk_id)
-                for entry in entries:
-                    _log_sync_history(conn, entry)
-        logger.info("DELETE %r (%d change log rows)", chunk_id, len(entries))
-        return True
-
-    # Determine source sheet from the entries
-    # All entries for the same chunk_id should come from the same sheet,
-    # but take the most recent one to be safe
-    last_entry = entries[-1]
-    sheet_name = last_entry.sheet_name
+    Instead of patching field-by-field, the whole chunk is rebuilt from its
+    prefetched source sheet, so if 5 fields changed on the same chunk we do
+    1 rebuild + 1 embed instead of 5.
+    """
+    sheet_name = _source_sheet(chunk_id, entries)
 
-    # ── Fetch the full chunk from source ──
-    if sheet_name == "FAQs" or chunk_id.startswith("scb_faq_"):
-        chunk = _fetch_chunk_from_faqs_sheet(spreadsheet, chunk_id)
+    if sheet_name == FAQS_SHEET:
+        chunk = _fetch_chunk_from_faqs_sheet(faqs, chunk_id)
     else:
-        chunk = _fetch_chunk_from_data_sheet(spreadsheet, sheet_name, chunk_id)
+        chunk = _fetch_chunk_from_data_sheet(data_sheets, sheet_name, chunk_id)
 
     if chunk is None:
         logger.error(
             "Could not rebuild chunk %r from sheet %r — skipping %d entries",
             chunk_id, sheet_name, len(entries),
         )
-        return False
+    return chunk
 
-    if not dry_run:
-        chunk.embedding = emb.embed_text(chunk.embed_text())
-        with conn:
-            _upsert_chunk(conn, chunk)
-            for entry in entries:
-                _log_sync_history(conn, entry)
 
-    fields_changed = list({e.field_changed for e in entries})
-    change_types = list({e.change_type for e in entries})
+def _embed_with_cache(conn, chunks: list[ChunkRecord]) -> None:
+    """
+    Set chunk.embedding for every chunk. Text already in embedding_cache is
+    served from there; the rest is embedded in one embed_batch call and
+    added to the cache.
+    """
+    texts = [c.embed_text() for c in chunks]
+    hashes = [_content_hash(t) for t in texts]
+    with conn, conn.cursor() as cur:
+        cached = _get_cached_embeddings(cur, hashes)
+
+    misses = [i for i, h in enumerate(hashes) if h not in cached]
+    logger.info("Embedding cache: %d hits, %d misses", len(chunks) - len(misses), len(misses))
+    if misses:
+        vectors = emb.embed_batch([texts[i] for i in misses])
+        new_items = [(hashes[i], vec) for i, vec in zip(misses, vectors)]
+        with conn, conn.cursor() as cur:
+            _store_cached_embeddings(cur, new_items)
+        cached.update(new_items)
+
+    for chunk, h in zip(chunks, hashes):
+        chunk.embedding = cached[h]
+
+
+def _is_noop(entry: ChangeLogEntry) -> bool:
+    """An UPDATE whose logged new value equals its old value changes nothing."""
+    return entry.change_type == "UPDATE" and entry.new_value == entry.old_value
+
+
+def _log_group(
+    chunk_id: str, entries: list[ChangeLogEntry], chunk: Optional[ChunkRecord], unchanged: bool
+) -> None:
+    if unchanged:
+        logger.info("UNCHANGED %r — already up to date (%d log rows)", chunk_id, len(entries))
+        return
+    if chunk is None:
+        logger.info("DELETE %r (%d change log rows)", chunk_id, len(entries))
+        return
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    change_types = ",".join(sorted({e.change_type for e in entries}))
+    fields_changed = ",".join(sorted({e.field_changed for e in entries}))
     logger.info(
         "UPSERT %r (types=%s, fields=%s, %d log rows)",
         chunk_id, change_types, fields_changed, len(entries),
     )
-    return True
 
 
 # ---------------------------------------------------------------------------
@@ -448,79 +611,130 @@ def sync(force: bool = False, dry_run: bool = False) -> None:
         logger.info("DRY RUN — no DB or sheet writes will occur")
 
     spreadsheet = config.get_spreadsheet()
-    sheet_version = _read_version(spreadsheet)
+    sheet_version, change_log_rows, faqs = _read_sheets(spreadsheet)
     logger.info("Sheet version: %s", sheet_version)
 
     db_pool = config.get_db_pool()
     conn = db_pool.getconn()
 
     try:
-        db_version = _get_last_version(conn)
-        logger.info("DB version:    %s", db_version)
-
-        if not force and sheet_version == db_version:
-            logger.info("Versions match — nothing to sync. Exiting.")
-            return
-
-        entries, row_indices = _read_unsynced_rows(spreadsheet)
+        # The sheet was read first; with --force the stored version is irrelevant.
+        if not force:
+            with conn, conn.cursor() as cur:
+                db_version = _get_last_version(cur)
+            logger.info("DB version:    %s", db_version)
+            if sheet_version == db_version:
+                logger.info("Versions match — nothing to sync. Exiting.")
+                return
+
+        entries, row_indices = _read_unsynced_rows(change_log_rows)
         logger.info("Found %d unsynced change log entries", len(entries))
 
         if not entries:
             if not dry_run:
-                with conn:
-                    _update_sync_state(conn, sheet_version)
+                with conn, conn.cursor() as cur:
+                    _update_sync_state(cur, sheet_version)
             logger.info("No unsynced rows. Updated version to %s.", sheet_version)
             return
 
         # ── Group entries by chunk_id ──
-        # Preserves order: processes chunks in the order of their first appearance
-        grouped: dict[str, list[tuple[ChangeLogEntry, int]]] = defaultdict(list)
+        # Preserves order: processes chunks in the order of their first appearance.
+        # Entries and their sheet rows go into parallel dicts, no per-row tuples.
+        group_entries: dict[str, list[ChangeLogEntry]] = {}
+        group_rows: dict[str, list[int]] = {}
         for entry, sheet_row in zip(entries, row_indices):
-            grouped[entry.chunk_id].append((entry, sheet_row))
+            group_entries.setdefault(entry.chunk_id, []).append(entry)
+            group_rows.setdefault(entry.chunk_id, []).append(sheet_row)
 
         logger.info(
             "Grouped into %d unique chunks from %d change log rows",
-            len(grouped), len(entries),
+            len(group_entries), len(entries),
         )
 
+        worksheets = _get_worksheets(spreadsheet)
+
         success_chunks = 0
-        success_rows = 0
         failed_chunks = 0
+        synced_rows: list[int] = []
+
+        # ── Pass 1: resolve each group to a DELETE, a no-op (both chunk=None) or a rebuilt chunk ──
+        deletes = {
+            cid for cid, group in group_entries.items() if any(e.change_type == "DELETE" for e in group)
+        }
+        # Groups made only of UPDATEs that didn't change anything need no rebuild at all.
+        noops = {
+            cid for cid, group in group_entries.items()
+            if cid not in deletes and all(_is_noop(e) for e in group)
+        }
+        # Every data sheet the rebuilds need, fetched in one batchGet.
+        data_sheets = _read_data_sheets(
+            spreadsheet,
+            worksheets,
+            {
+                _source_sheet(cid, group)
+                for cid, group in group_entries.items()
+                if cid not in deletes and cid not in noops
+            } - {FAQS_SHEET},
+        )
 
-        for chunk_id, group in grouped.items():
-            group_entries = [e for e, _ in group]
-            group_row_indices = [r for _, r in group]
-
+        resolved: list[tuple[str, Optional[ChunkRecord]]] = []
+        for chunk_id, group in group_entries.items():
+            if chunk_id in deletes or chunk_id in noops:
+                resolved.append((chunk_id, None))
+                continue
             try:
-                ok = _resolve_chunk_group(conn, spreadsheet, chunk_id, group_entries, dry_run)
-
-                if ok and not dry_run:
-                    _mark_synced_batch(spreadsheet, group_row_indices)
-                    success_chunks += 1
-                    success_rows += len(group_row_indices)
-                elif not ok:
-                    failed_chunks += 1
-
+                chunk = _build_chunk(data_sheets, faqs, chunk_id, group)
             except Exception as exc:
                 logger.error(
-                    "Failed to process chunk %r (%d entries): %s",
-                    chunk_id, len(group_entries), exc, exc_info=True,
+                    "Failed to rebuild chunk %r (%d entries): %s",
+                    chunk_id, len(group), exc, exc_info=True,
                 )
+                chunk = None
+            if chunk is None:
                 failed_chunks += 1
+                continue
+            resolved.append((chunk_id, chunk))
+
+        # ── Skip rebuilt chunks whose content already matches the stored row ──
+        rebuilt = {cid: chunk for cid, chunk in resolved if chunk is not None}
+        unchanged = set(noops)
+        if rebuilt:
+            with conn, conn.cursor() as cur:
+                existing = _get_existing_chunks(cur, list(rebuilt))
+            unchanged.update(
+                cid for cid, chunk in rebuilt.items() if existing.get(cid) == _content(chunk)
+            )
+        changed = [chunk for cid, chunk in rebuilt.items() if cid not in unchanged]
+
+        # ── Pass 2: embed every changed chunk, reusing cached vectors ──
+        if changed and not dry_run:
+            _embed_with_cache(conn, changed)
 
+        # ── Pass 3: deletes, upserts, history and sync_state in one transaction ──
+        if not dry_run:
+            with conn, conn.cursor() as cur:
+                _delete_chunks(cur, [cid for cid, _ in resolved if cid in deletes])
+                _upsert_chunks(cur, changed, bulk=force)
+                _log_sync_history(cur, [e for cid, _ in resolved for e in group_entries[cid]])
+                _update_sync_state(cur, sheet_version)
+            success_chunks = len(resolved)
+            synced_rows = [r for cid, _ in resolved for r in group_rows[cid]]
+
+        for chunk_id, chunk in resolved:
+            _log_group(chunk_id, group_entries[chunk_id], chunk, chunk_id in unchanged)
+
+        # Only after the DB commit, so a row is never marked synced for a rolled-back write.
         if not dry_run:
-            with conn:
-                _update_sync_state(conn, sheet_version)
+            _mark_synced_batch(worksheets, synced_rows)
 
         logger.info(
             "Sync complete — %d chunks (%d rows) synced, %d chunks failed. "
             "DB version now %s.",
-            success_chunks, success_rows, failed_chunks, sheet_version,
+            success_chunks, len(synced_rows), failed_chunks, sheet_version,
         )
 
     finally:
         db_pool.putconn(conn)
-        config.close_db_pool()
 
 
 # ---------------------------------------------------------------------------
@@ -533,8 +747,12 @@ def main() -> None:
     parser.add_argument("--force", action="store_true", help="Ignore version check")
     parser.add_argument("--dry-run", action="store_true", help="Simulate; no writes")
     args = parser.parse_args()
+    # The pool outlives sync() so programmatic callers (the server, schedulers)
+    # reuse warm connections; the CLI closes it on exit.
+    atexit.register(config.close_db_pool)
     sync(force=args.force, dry_run=args.dry_run)
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s  %(message)s")
     main()
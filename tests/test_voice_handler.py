@@ -0,0 +1,62 @@
+"""_clean_for_tts must match the original one-rule-per-pass cleanup."""
+
+import re
+import unittest
+
+from chatbot.voice_handler import _clean_for_tts
+
+
+def _baseline_clean_for_tts(text: str) -> str:
+    """The original cleanup: one regex pass per rule, in this order."""
+    text = re.sub(r"\*+", "", text)
+    text = re.sub(r"#+\s*", "", text)
+    text = re.sub(r"`+", "", text)
+    text = re.sub(r"\[([^\]]+)\]\([^\)]+\)", r"\1", text)
+    text = re.sub(r"^\s*[-*]\s+", "", text, flags=re.MULTILINE)
+    return re.sub(r"\n+", " ", text).strip()
+
+
+CASES = [
+    # (input, expected)
+    ("", ""),
+    ("Plain text.", "Plain text."),
+    ("**Bold** and *italic*", "Bold and italic"),
+    ("## Hours\nOpen daily", "Hours Open daily"),
+    ("Use `code` here", "Use code here"),
+    ("See [our site](https://example.com) now", "See our site now"),
+    ("- one\n- two", "one two"),
+    # "*" bullets lose their marker in the first pass, before the bullet rule.
+    ("- one\n* two", "one  two"),
+    ("a\n\n\nb", "a b"),
+    # Bullets that only become line-initial once a marker is stripped.
+    ("# - item", "item"),
+    ("`- x", "x"),
+    ("**- Bold**", "Bold"),
+    # Markers interleaved with headings and whitespace.
+    ("#* x", "x"),
+    ("-#* x", "-x"),
+    ("#` x", "x"),
+    ("#*#", ""),
+    # Links only match once the markers inside them are gone.
+    ("[a](*)", "[a]()"),
+    ("[*](x)", "[](x)"),
+    ("[a]#(x)", "a"),
+    ("[**Book**](https://example.com/book)", "Book"),
+    ("\n- Jump: $20\n- Climb: $15\n", "Jump: $20 Climb: $15"),
+]
+
+
+class CleanForTTSTest(unittest.TestCase):
+    def test_table(self):
+        for text, expected in CASES:
+            with self.subTest(text=text):
+                self.assertEqual(_clean_for_tts(text), expected)
+
+    def test_matches_baseline(self):
+        for text, _ in CASES:
+            with self.subTest(text=text):
+                self.assertEqual(_clean_for_tts(text), _baseline_clean_for_tts(text))
+
+
+if __name__ == "__main__":
+    unittest.main()